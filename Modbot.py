@@ -1,17 +1,25 @@
 # -*- coding: utf8 -*-
+from cogs.utils.startup_profile import profile  # first, so the imports below are timed
 import asyncio
 
 import discord
 from discord.ext.commands import Bot
 from discord.ext import commands
+import shutil
 import sys
 import traceback
 import json
 from datetime import datetime
 from cogs.utils.db_utils import str_keys_to_int_keys, convert_old_db, int_keys_to_str_keys
+from cogs.utils import metrics, tracing
+from cogs.utils.api_usage import ApiUsage
+from cogs.utils.http_client import HTTPClient
+from cogs.utils.locale_store import load_locale_store, save_locale_store_sync
+from cogs.utils.recent_reports import load_recent_reports, json_default
 from dotenv import load_dotenv
 
 import os
+profile.checkpoint("imports")
 
 try:
     if not os.listdir('cogs/utils/BotUtils'):
@@ -19,7 +27,9 @@ try:
 except FileNotFoundError:
     raise FileNotFoundError("The BotUtils submodule is not initialized. "
                             "Please run 'git submodule update --init --recursive' to initialize it.")
+profile.checkpoint("BotUtils check")
 from cogs.utils import helper_functions as hf
+profile.checkpoint("import helper_functions")
 
 dir_path = os.path.dirname(os.path.realpath(__file__))
 
@@ -46,12 +56,14 @@ load_dotenv(f'{dir_path}/.env')
 
 if not os.getenv("BOT_TOKEN"):
     raise discord.LoginFailure("You need to add your bot token to the .env file in your bot folder.")
+profile.checkpoint(".env checks")
 
 
 class Modbot(Bot):
     def __init__(self):
         super().__init__(description="Bot by Ryry013#9234", command_prefix=os.getenv("DEFAULT_PREFIX"),
                          intents=intents, owner_id=int(os.getenv("OWNER_ID") or 0) or None)
+        profile.checkpoint("discord.py Bot init")
         print('starting loading of jsons')
         db_file_path = f"{dir_path}/modbot.json"
         if os.path.exists(db_file_path):
@@ -65,22 +77,50 @@ class Modbot(Bot):
                 "settingup": [],
                 "guilds": {},
                 "reports": {},
-                "user_localizations": {},
                 "recent_reports": {},
                 "buttons": {}
             }
 
+        profile.checkpoint("load and convert modbot.json")
+
+        # user locales used to be kept in the main database, they now have their own file
+        locale_file_path = f"{dir_path}/user_localizations.json"
+        self.locale_store = load_locale_store(locale_file_path, self.db.pop('user_localizations', None))
+        if not os.path.exists(locale_file_path):
+            # write the moved locales now, they're no longer in modbot.json once it's next saved
+            save_locale_store_sync(locale_file_path, self.locale_store.to_json())
+            self.locale_store.dirty = False
+        self.db['recent_reports'] = load_recent_reports(self.db.get('recent_reports'))
+        profile.checkpoint("load locales and recent reports")
+
         date = datetime.today().strftime("%d%m%Y%H%M")
         backup_dir = f"{dir_path}/database_backups"
         if not os.path.exists(backup_dir):
             os.makedirs(backup_dir)
         with open(f"{backup_dir}/database_{date}.json", "w") as write_file:
-            json.dump(int_keys_to_str_keys(self.db), write_file)
+            json.dump(int_keys_to_str_keys(self.db), write_file, default=json_default)
+        shutil.copy(locale_file_path, f"{backup_dir}/user_localizations_{date}.json")
+        profile.checkpoint("database backup")
 
         self.log_channel = None
         self.error_channel = None
 
     async def setup_hook(self):
+        profile.checkpoint("event loop start and login")
+        # shared session for outbound HTTP requests, started before the cogs so they can use it in cog_load()
+        self.http_client = HTTPClient()
+        await self.http_client.start()
+
+        # counts the Discord API calls per feature and route, and holds back features over their budget
+        self.api_usage = ApiUsage()
+        self.api_usage.install(self.http)
+
+        # Prometheus-style metrics at http://127.0.0.1:METRICS_PORT/metrics, only if METRICS_PORT is set in .env
+        self.metrics_runner = None
+        if port := metrics.metrics_port():
+            self.metrics_runner = await metrics.start_http_server(port, os.getenv("METRICS_HOST", "127.0.0.1"))
+        profile.checkpoint("HTTP client, API usage and metrics setup")
+
         for extension in ['cogs.modbot', 'cogs.main', 'cogs.admin', 'cogs.owner', 'cogs.unbans', 'cogs.events',
                           'cogs.submod', 'cogs.report_status']:
             try:
@@ -89,8 +129,20 @@ class Modbot(Bot):
                 print(f'Failed to load {extension}', file=sys.stderr)
                 traceback.print_exc()
                 raise
+            profile.checkpoint(f"load extension {extension}")
 
         hf.setup(bot=self, loop=asyncio.get_event_loop())  # this is to define here.bot in the hf file
+        profile.checkpoint("hf.setup")
+
+    async def close(self):
+        for summarizer in getattr(self, "summarizers", {}).values():
+            summarizer.close()
+        if getattr(self, "http_client", None):
+            await self.http_client.close()
+        if getattr(self, "metrics_runner", None):
+            await self.metrics_runner.cleanup()
+        await tracing.flush()
+        await super().close()
             
 
 def run_bot():
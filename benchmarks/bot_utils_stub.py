@@ -0,0 +1,43 @@
+"""A stand-in for the parts of the BotUtils submodule (cogs/utils/BotUtils/bot_utils.py) that the benchmarked code
+paths use, so the benchmarks can run from a checkout without the submodule.
+
+install_if_missing() only registers it if the real submodule can't be imported, and it has to be called before
+anything imports the cogs. With the submodule checked out, the benchmarks run against the real one."""
+import asyncio
+import importlib
+import sys
+import types
+
+import discord
+
+_tasks: set[asyncio.Task] = set()
+
+
+class RaiView(discord.ui.View):
+    pass
+
+
+def asyncio_task(func, *args, **kwargs) -> asyncio.Task:
+    task = asyncio.create_task(func(*args, **kwargs))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+def rem_emoji_url(msg) -> str:
+    return msg.content
+
+
+def install_if_missing():
+    try:
+        importlib.import_module("cogs.utils.BotUtils.bot_utils")
+        return
+    except ImportError:
+        pass
+
+    print("The BotUtils submodule isn't checked out, using benchmarks/bot_utils_stub.py instead", file=sys.stderr)
+    package = types.ModuleType("cogs.utils.BotUtils")
+    package.__path__ = []
+    package.bot_utils = sys.modules[__name__]
+    sys.modules["cogs.utils.BotUtils"] = package
+    sys.modules["cogs.utils.BotUtils.bot_utils"] = sys.modules[__name__]
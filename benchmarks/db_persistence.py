@@ -0,0 +1,170 @@
+"""Times the database helpers and the saving/loading of the database on generated databases of different sizes.
+
+Covered: str_keys_to_int_keys(), int_keys_to_str_keys(), convert_old_db(), get_thread_id_to_thread_info(),
+helper_functions._dump_json_sync() (what every autosave runs), and the startup load in Modbot.__init__() (reading
+modbot.json and user_localizations.json and converting them).
+
+The generated databases have a given number of users, most with a locale, some with recent reports in one of the
+guilds (1-5 reports with summaries), and about 1% in an open report.
+
+Run from the bot folder:
+    python -m benchmarks.db_persistence
+    python -m benchmarks.db_persistence --sizes 100 1000 10000 100000 --save benchmarks/baselines/db_persistence.json
+    python -m benchmarks.db_persistence --compare benchmarks/baselines/db_persistence.json
+
+--compare prints each result as a ratio to the saved one, so persistence changes can be checked against numbers
+recorded before the change (on the same machine)."""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from benchmarks.bot_utils_stub import install_if_missing
+
+install_if_missing()  # before importing helper_functions
+from cogs.utils import helper_functions as hf
+from cogs.utils.db_utils import convert_old_db, get_thread_id_to_thread_info, int_keys_to_str_keys, \
+    str_keys_to_int_keys
+from cogs.utils.locale_store import LocaleStore, load_locale_store, save_locale_store_sync, today
+from cogs.utils.recent_reports import RecentReport, json_default, load_recent_reports, new_report_buffer
+
+LOCALES = ["en", "es", "ja", "fr", "zh", "ar", "pt", "de", "ko", "ru"]
+SUMMARY = "A user in the general channel keeps sending me insulting messages, I have screenshots of it"
+
+
+def snowflake(rng: random.Random) -> int:
+    return rng.randrange(10 ** 17, 10 ** 19)
+
+
+def generate_db(users: int, seed: int = 0) -> tuple[dict, LocaleStore]:
+    """Builds a database like bot.db after loading (int keys, recent reports as ring buffers) and the locale store"""
+    rng = random.Random(seed)
+    now = int(time.time())
+    guild_ids = [snowflake(rng) for _ in range(max(1, users // 1000))]
+    db = {
+        "prefix": {},
+        "settingup": [],
+        "guilds": {guild_id: {"channel": snowflake(rng), "mod_role": snowflake(rng)} for guild_id in guild_ids},
+        "reports": {},
+        "recent_reports": {guild_id: {} for guild_id in guild_ids},
+        "buttons": {},
+    }
+    locale_store = LocaleStore()
+    for _ in range(users):
+        user_id = snowflake(rng)
+        if rng.random() < 0.9:
+            locale_store.locales[user_id] = (rng.choice(LOCALES), today() - rng.randrange(180))
+        if rng.random() < 0.3:
+            buffer = new_report_buffer()
+            for timestamp in sorted(now - rng.randrange(365 * 86400) for _ in range(rng.randint(1, 5))):
+                buffer.append(RecentReport(snowflake(rng), timestamp, SUMMARY if rng.random() < 0.8 else None))
+            db["recent_reports"][rng.choice(guild_ids)][user_id] = buffer
+        if rng.random() < 0.01:
+            db["reports"][user_id] = {
+                "user_id": user_id,
+                "thread_id": snowflake(rng),
+                "guild_id": rng.choice(guild_ids),
+                "report_room_type": "main",
+                "mods": [snowflake(rng) for _ in range(rng.randint(0, 3))],
+                "not_anonymous": False,
+                "permanent_non_anonymous_notified_mods": [],
+            }
+    return db, locale_store
+
+
+def generate_old_db(db: dict, locale_store: LocaleStore) -> dict:
+    """The format from before convert_old_db(), as it was read from the json (string keys)"""
+    return {
+        "prefix": {},
+        "insetup": [],
+        "inreportroom": {},
+        "guilds": {str(guild_id): {"channel": str(config["channel"])} for guild_id, config in db["guilds"].items()},
+        "modrole": {str(guild_id): str(config["mod_role"]) for guild_id, config in db["guilds"].items()},
+        "user_localizations": {str(user_id): code for user_id, (code, _) in locale_store.locales.items()},
+    }
+
+
+def startup_load(dir_path: str):
+    """The loading done in Modbot.__init__()"""
+    with open(f"{dir_path}/modbot.json", "r") as read_file:
+        db = str_keys_to_int_keys(convert_old_db(json.load(read_file)))
+    locale_store = load_locale_store(f"{dir_path}/user_localizations.json", db.pop('user_localizations', None))
+    db['recent_reports'] = load_recent_reports(db.get('recent_reports'))
+    return db, locale_store
+
+
+def time_it(func, repeat: int) -> float:
+    """Median seconds of `repeat` calls"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def bench_size(users: int, repeat: int) -> dict[str, float]:
+    db, locale_store = generate_db(users)
+    str_db = json.loads(json.dumps(int_keys_to_str_keys(db), default=json_default))
+    old_db = generate_old_db(db, locale_store)
+    results = {
+        "str_keys_to_int_keys": time_it(lambda: str_keys_to_int_keys(str_db), repeat),
+        "int_keys_to_str_keys": time_it(lambda: int_keys_to_str_keys(db), repeat),
+        "convert_old_db": time_it(lambda: convert_old_db(dict(old_db)), repeat),
+        "get_thread_id_to_thread_info": time_it(lambda: get_thread_id_to_thread_info(db), repeat),
+    }
+
+    with tempfile.TemporaryDirectory(prefix="modbot_db_bench_") as dir_path:
+        hf.dir_path = dir_path  # _dump_json_sync() writes here instead of the bot folder
+        hf.here.bot = SimpleNamespace(db=db)
+        results["_dump_json_sync"] = time_it(hf._dump_json_sync, repeat)
+        save_locale_store_sync(f"{dir_path}/user_localizations.json", locale_store.to_json())
+        results["startup_load"] = time_it(lambda: startup_load(dir_path), repeat)
+        results["modbot.json bytes"] = os.path.getsize(f"{dir_path}/modbot.json")
+        results["user_localizations.json bytes"] = os.path.getsize(f"{dir_path}/user_localizations.json")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000], help="numbers of users")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="write the results to this json file")
+    parser.add_argument("--compare", help="show the results relative to a json file written by --save")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, "r") as read_file:
+            baseline = json.load(read_file)["results"]
+
+    results = {}
+    for users in args.sizes:
+        results[str(users)] = bench_size(users, args.repeat)
+        print(f"{users} users:")
+        for name, value in results[str(users)].items():
+            shown = f"{value:12,d}" if name.endswith("bytes") else f"{value * 1000:9.2f} ms"
+            old_value = baseline.get(str(users), {}).get(name)
+            compared = f"  ({value / old_value:.2f}x baseline)" if old_value else ""
+            print(f"    {name:<32}{shown}{compared}")
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as write_file:
+            json.dump({"meta": {"date": datetime.now().isoformat(timespec="seconds"),
+                                "python": sys.version.split()[0],
+                                "platform": platform.platform(),
+                                "repeat": args.repeat},
+                       "results": results}, write_file, indent=4)
+        print(f"Saved results to {args.save}")
+
+
+if __name__ == '__main__':
+    main()
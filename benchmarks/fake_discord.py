@@ -0,0 +1,617 @@
+"""An offline stand-in for the parts of discord.py that the report relay uses, so the cogs can be driven without
+a gateway connection or a bot token.
+
+FakeBot plays the part of commands.Bot: it hands events to the loaded cogs the way the gateway would
+(dispatch() resolves wait_for() calls and runs the cog listeners as tasks), and it keeps the db, the locale store
+and the channel/user caches the cogs read from. The channels subclass the real discord.py channel classes so the
+isinstance() checks in the cogs behave the same as in production, but every API call they would make goes through
+FakeAPI instead, which waits a configurable latency, can answer with rate limits, and counts the calls per route.
+
+Nothing here talks to Discord. See benchmarks/relay_latency.py for a script using it."""
+import asyncio
+import io
+import itertools
+import random
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import Optional, Union
+
+import discord
+
+from benchmarks.bot_utils_stub import install_if_missing
+from cogs.utils.locale_store import LocaleStore
+
+install_if_missing()  # before the scripts using this import the cogs
+
+_snowflakes = itertools.count(100_000_000_000_000_000)  # 18 digits, like real IDs, so the db key conversions work
+
+
+def new_id() -> int:
+    return next(_snowflakes)
+
+
+def http_error(cls: type[discord.HTTPException], status: int, reason: str, text: str = ""):
+    """Builds a discord.py HTTP exception without a real aiohttp response"""
+    return cls(SimpleNamespace(status=status, reason=reason), text)
+
+
+class FakeAPI:
+    """Stands in for Discord's REST API. Each call sleeps for a random latency, and a call can be answered with a
+    429, which is waited out and retried the same way discord.py does it."""
+    def __init__(self,
+                 latency_ms: float = 50.0,
+                 jitter_ms: float = 20.0,
+                 rate_limit_chance: float = 0.0,
+                 retry_after: float = 1.0,
+                 seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit_chance = rate_limit_chance
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.calls: Counter[str] = Counter()  # route -> number of requests
+        self.rate_limits: Counter[str] = Counter()  # route -> number of 429s
+        self.busy = 0.0  # total seconds spent waiting on requests
+
+    async def request(self, route: str):
+        self.calls[route] += 1
+        start = time.perf_counter()
+        while True:
+            await asyncio.sleep(max(0.0, self.rng.gauss(self.latency_ms, self.jitter_ms)) / 1000)
+            if self.rate_limit_chance and self.rng.random() < self.rate_limit_chance:
+                self.rate_limits[route] += 1
+                await asyncio.sleep(self.retry_after)
+                continue
+            break
+        self.busy += time.perf_counter() - start
+
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+
+class FakeAttachment:
+    def __init__(self, api: FakeAPI, filename: str = "image.png", size: int = 50_000):
+        self.api = api
+        self.id = new_id()
+        self.filename = filename
+        self.size = size
+        self.url = f"https://cdn.discordapp.com/attachments/{self.id}/{filename}"
+
+    async def to_file(self) -> discord.File:
+        await self.api.request("GET /attachments/{attachment_id}")
+        return discord.File(io.BytesIO(bytes(self.size)), filename=self.filename)
+
+
+class FakeMessage:
+    def __init__(self, bot: 'FakeBot', channel, author, content: str = "", *,
+                 embeds: Optional[list[discord.Embed]] = None,
+                 attachments: Optional[list[FakeAttachment]] = None,
+                 view: Optional[discord.ui.View] = None,
+                 msg_id: Optional[int] = None):
+        self.bot = bot
+        self.id = msg_id or new_id()
+        self.channel = channel
+        self.author = author
+        self.content = content or ""
+        self.embeds = embeds or []
+        self.attachments = attachments or []
+        self.stickers = []
+        self.view = view
+        self.reactions: list[str] = []
+        self.type = discord.MessageType.default
+        self.created_at = discord.utils.utcnow()
+
+    @property
+    def guild(self):
+        return getattr(self.channel, 'guild', None)
+
+    def __eq__(self, other):
+        return isinstance(other, FakeMessage) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    async def add_reaction(self, emoji):
+        await self.bot.api.request("PUT /channels/{channel_id}/messages/{message_id}/reactions/{emoji}/@me")
+        self.reactions.append(str(emoji))
+
+    async def remove_reaction(self, emoji, member):
+        await self.bot.api.request("DELETE /channels/{channel_id}/messages/{message_id}/reactions/{emoji}/{member_id}")
+        if str(emoji) in self.reactions:
+            self.reactions.remove(str(emoji))
+
+    async def reply(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+    async def edit(self, *, content=discord.utils.MISSING, embed=discord.utils.MISSING, view=discord.utils.MISSING,
+                   **kwargs):
+        await self.bot.api.request("PATCH /channels/{channel_id}/messages/{message_id}")
+        if content is not discord.utils.MISSING:
+            self.content = content or ""
+        if embed is not discord.utils.MISSING:
+            self.embeds = [embed] if embed else []
+        if view is not discord.utils.MISSING:
+            self.view = view
+            if view and isinstance(self.channel, FakeDMChannel):
+                self.channel.recipient.on_view(self)
+        return self
+
+    async def delete(self, *, delay=None):
+        await self.bot.api.request("DELETE /channels/{channel_id}/messages/{message_id}")
+        history = getattr(self.channel, 'messages', None)
+        if history is not None and self in history:
+            history.remove(self)
+
+    async def create_thread(self, *, name: str, **kwargs) -> 'FakeThread':
+        await self.bot.api.request("POST /channels/{channel_id}/messages/{message_id}/threads")
+        # a thread made from a message shares the ID of the message
+        thread = FakeThread(self.bot, self.channel, name, thread_id=self.id)
+        thread.starter_message = self
+        return thread
+
+
+class MessageableMixin:
+    """send(), typing() and history() for the fake channels"""
+    bot: 'FakeBot'
+    messages: list[FakeMessage]
+
+    async def send(self, content=None, *, embed=None, embeds=None, file=None, files=None, view=None,
+                   stickers=None, **kwargs) -> FakeMessage:
+        await self.bot.api.request("POST /channels/{channel_id}/messages")
+        all_embeds = list(embeds or []) + ([embed] if embed else [])
+        attachments = []
+        for f in ([file] if file else []) + list(files or []):
+            attachments.append(FakeAttachment(self.bot.api, f.filename))
+        msg = FakeMessage(self.bot, self, self.bot.user, content or "", embeds=all_embeds,
+                          attachments=attachments, view=view)
+        self.messages.append(msg)
+        if isinstance(self, FakeDMChannel):
+            if view:
+                self.recipient.on_view(msg)
+            self.recipient.on_dm(msg)
+        # the gateway echoes my own messages back as message events
+        self.bot.dispatch('message', msg)
+        return msg
+
+    async def typing(self):
+        await self.bot.api.request("POST /channels/{channel_id}/typing")
+
+    async def history(self, *, limit: Optional[int] = 100, oldest_first: bool = False, **kwargs):
+        await self.bot.api.request("GET /channels/{channel_id}/messages")
+        messages = self.messages if oldest_first else list(reversed(self.messages))
+        for msg in messages[:limit]:
+            yield msg
+
+    async def fetch_message(self, msg_id: int) -> FakeMessage:
+        await self.bot.api.request("GET /channels/{channel_id}/messages/{message_id}")
+        for msg in self.messages:
+            if msg.id == msg_id:
+                return msg
+        raise http_error(discord.NotFound, 404, "Not Found", "Unknown Message")
+
+
+class FakeDMChannel(MessageableMixin, discord.DMChannel):
+    recipient = None  # shadows the discord.py properties, set per instance in __init__
+    guild = None
+
+    def __init__(self, bot: 'FakeBot', recipient: 'FakeUser'):
+        self.bot = bot
+        self.id = new_id()
+        self.recipient = recipient
+        self.me = bot.user
+        self.messages = []
+
+
+class FakeThread(MessageableMixin, discord.Thread):
+    parent = None
+    starter_message = None
+    applied_tags = None
+    flags = None
+
+    def __init__(self, bot: 'FakeBot', parent: Union['FakeTextChannel', 'FakeForumChannel'], name: str,
+                 thread_id: Optional[int] = None, applied_tags: Optional[list] = None):
+        self.bot = bot
+        self.id = thread_id or new_id()
+        self.name = name
+        self.guild = parent.guild
+        self.parent = parent
+        self.parent_id = parent.id
+        self.archived = False
+        self.locked = False
+        self.applied_tags = list(applied_tags or [])
+        self.flags = SimpleNamespace(pinned=False)
+        self.messages = []
+        parent.thread_list.append(self)
+        bot.add_channel(self)
+
+    def _copy(self) -> 'FakeThread':
+        copy = FakeThread.__new__(FakeThread)
+        copy.__dict__.update(self.__dict__)
+        for attr in ('id', 'name', 'guild', 'parent_id', 'archived', 'locked'):
+            setattr(copy, attr, getattr(self, attr))
+        copy.applied_tags = list(self.applied_tags)
+        return copy
+
+    async def edit(self, *, archived: Optional[bool] = None, applied_tags: Optional[list] = None,
+                   pinned: Optional[bool] = None, **kwargs) -> 'FakeThread':
+        await self.bot.api.request("PATCH /channels/{channel_id}")
+        before = self._copy()
+        if applied_tags is not None:
+            self.applied_tags = list(applied_tags)
+        if pinned is not None:
+            self.flags.pinned = pinned
+        if archived is not None:
+            self.archived = archived
+            if archived and not before.archived:
+                self.guild.add_audit_log_entry(discord.AuditLogAction.thread_update, self.bot.user, self)
+        self.bot.dispatch('thread_update', before, self)
+        return self
+
+
+class GuildChannelMixin:
+    """Permissions and thread lookups shared by the fake report channels"""
+    thread_list: list[FakeThread]
+    guild: 'FakeGuild'
+
+    def permissions_for(self, member) -> discord.Permissions:
+        if member is None:
+            return discord.Permissions.none()
+        if member == self.guild.me or member.id in self.guild.mod_ids:
+            return discord.Permissions.all()
+        return discord.Permissions.none()
+
+    def get_thread(self, thread_id: int) -> Optional[FakeThread]:
+        for thread in self.thread_list:
+            if thread.id == thread_id:
+                return thread
+        return None
+
+
+class FakeTextChannel(GuildChannelMixin, MessageableMixin, discord.TextChannel):
+    threads = None
+
+    def __init__(self, bot: 'FakeBot', guild: 'FakeGuild', name: str):
+        self.bot = bot
+        self.id = new_id()
+        self.name = name
+        self.guild = guild
+        self.topic = None
+        self.category_id = None
+        self.messages = []
+        self.thread_list = []
+        bot.add_channel(self)
+
+    @property
+    def threads(self) -> list[FakeThread]:
+        return [t for t in self.thread_list if not t.archived]
+
+
+class FakeForumChannel(GuildChannelMixin, discord.ForumChannel):
+    available_tags = None
+
+    def __init__(self, bot: 'FakeBot', guild: 'FakeGuild', name: str, tags: dict[str, str]):
+        self.bot = bot
+        self.id = new_id()
+        self.name = name
+        self.guild = guild
+        self.topic = None
+        self.category_id = None
+        self.thread_list = []
+        self.available_tags = [SimpleNamespace(id=new_id(), name=tag_name, emoji=emoji)
+                               for tag_name, emoji in tags.items()]
+        bot.add_channel(self)
+
+    @property
+    def threads(self) -> list[FakeThread]:
+        return [t for t in self.thread_list if not t.archived]
+
+    async def create_thread(self, *, name: str, content: str = None, applied_tags: Optional[list] = None,
+                            **kwargs) -> SimpleNamespace:
+        await self.bot.api.request("POST /channels/{channel_id}/threads")
+        thread = FakeThread(self.bot, self, name, applied_tags=applied_tags)
+        # the first message of a forum post shares the ID of the post
+        starter_message = FakeMessage(self.bot, thread, self.bot.user, content, msg_id=thread.id)
+        thread.messages.append(starter_message)
+        thread.starter_message = starter_message
+        return SimpleNamespace(thread=thread, message=starter_message)
+
+
+class FakeUser:
+    """A user, and the simulated person behind it who answers the buttons the bot sends them"""
+    def __init__(self, client: 'FakeBot', name: str, *, bot: bool = False, user_id: Optional[int] = None):
+        self.client = client
+        self.id = user_id or new_id()
+        self.name = name
+        self.display_name = name
+        self.discriminator = "0"
+        self.bot = bot
+        self.dm_channel: Optional[FakeDMChannel] = None
+        # labels of the buttons this user presses when given a choice, the first button is pressed otherwise
+        self.preferred_buttons = {"No"}
+        self.guild_choice = 1  # number replied when asked which server to connect to
+        self.locale = discord.Locale.american_english
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+    def __str__(self):
+        return self.name
+
+    def __eq__(self, other):
+        return isinstance(other, (FakeUser, FakeMember)) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    async def create_dm(self) -> FakeDMChannel:
+        if not self.dm_channel:
+            await self.client.api.request("POST /users/@me/channels")
+            self.dm_channel = FakeDMChannel(self.client, self)
+            self.client.add_channel(self.dm_channel)
+        return self.dm_channel
+
+    async def send(self, content=None, **kwargs) -> FakeMessage:
+        dm_channel = await self.create_dm()
+        return await dm_channel.send(content, **kwargs)
+
+    def on_dm(self, msg: FakeMessage):
+        """Called for every DM the bot sends this user, answers the server_select() guild list"""
+        if msg.embeds and (msg.embeds[0].description or "").startswith("`1)`"):
+            self.client.track(self.reply_in_dms(str(self.guild_choice)))
+
+    async def reply_in_dms(self, content: str):
+        await asyncio.sleep(0.05)
+        msg = FakeMessage(self.client, self.dm_channel, self, content)
+        self.dm_channel.messages.append(msg)
+        self.client.dispatch('message', msg)
+
+    def on_view(self, msg: FakeMessage):
+        """Called when the bot sends this user buttons, presses one of them a moment later"""
+        buttons = [item for item in msg.view.children if isinstance(item, discord.ui.Button)]
+        if not buttons:
+            return
+        button = next((b for b in buttons if b.label in self.preferred_buttons), buttons[0])
+        self.client.track(self.press(button, msg))
+
+    async def press(self, button: discord.ui.Button, msg: FakeMessage):
+        await asyncio.sleep(0.05)  # humans take a moment
+        interaction = FakeInteraction(self.client, self, button.custom_id, msg)
+        # discord.py hands the interaction to wait_for() and runs the button's callback at the same time
+        self.client.dispatch('interaction', interaction)
+        await button.callback(interaction)
+
+
+class FakeMember:
+    """A user as a member of a guild, everything not guild-specific comes from the user"""
+    def __init__(self, user: FakeUser, guild: 'FakeGuild', *, administrator: bool = False):
+        self._user = user
+        self.guild = guild
+        self.roles = []
+        self.guild_permissions = discord.Permissions.all() if administrator else discord.Permissions.none()
+
+    def __getattr__(self, item):
+        return getattr(self._user, item)
+
+    def __eq__(self, other):
+        return isinstance(other, (FakeUser, FakeMember)) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self._user.id)
+
+    def __str__(self):
+        return str(self._user)
+
+
+class FakeInteractionResponse:
+    def __init__(self, api: FakeAPI):
+        self.api = api
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def send_message(self, content=None, **kwargs):
+        await self.api.request("POST /interactions/{interaction_id}/{interaction_token}/callback")
+        self._done = True
+
+    async def defer(self, **kwargs):
+        await self.api.request("POST /interactions/{interaction_id}/{interaction_token}/callback")
+        self._done = True
+
+
+class FakeInteraction:
+    def __init__(self, bot: 'FakeBot', user: FakeUser, custom_id: str, message: FakeMessage):
+        self.id = new_id()
+        self.type = discord.InteractionType.component
+        self.data = {"custom_id": custom_id}
+        self.user = user
+        self.message = message
+        self.channel = message.channel
+        self.guild = message.guild
+        self.locale = user.locale
+        self.response = FakeInteractionResponse(bot.api)
+
+
+class FakeGuild:
+    def __init__(self, bot: 'FakeBot', name: str):
+        self.bot = bot
+        self.id = new_id()
+        self.name = name
+        self._members: dict[int, FakeMember] = {}
+        self.mod_ids: set[int] = set()
+        self.roles = []
+        self.categories = []
+        self.channels = []
+        self.audit_log: list[SimpleNamespace] = []
+        self.me = self.add_member(bot.user, administrator=True)
+        bot.guilds.append(self)
+
+    @property
+    def members(self) -> list[FakeMember]:
+        return list(self._members.values())
+
+    @property
+    def member_count(self) -> int:
+        return len(self._members)
+
+    def add_member(self, user: FakeUser, *, administrator: bool = False) -> FakeMember:
+        member = FakeMember(user, self, administrator=administrator)
+        self._members[user.id] = member
+        if administrator:
+            self.mod_ids.add(user.id)
+        return member
+
+    def get_member(self, user_id: int) -> Optional[FakeMember]:
+        return self._members.get(user_id)
+
+    def get_role(self, role_id: int):
+        return None
+
+    def get_channel(self, channel_id: int):
+        return self.bot.get_channel(channel_id)
+
+    def add_audit_log_entry(self, action: discord.AuditLogAction, user, target):
+        self.audit_log.append(SimpleNamespace(id=new_id(), action=action, user=user, target=target))
+
+    async def audit_logs(self, *, limit: Optional[int] = 100, action: Optional[discord.AuditLogAction] = None,
+                         **kwargs):
+        await self.bot.api.request("GET /guilds/{guild_id}/audit-logs")
+        entries = [entry for entry in reversed(self.audit_log) if action is None or entry.action == action]
+        for entry in entries[:limit]:
+            yield entry
+
+
+class FakeBot:
+    """Enough of commands.Bot for the report cogs: the db, the caches, wait_for() and event dispatch"""
+    def __init__(self, api: Optional[FakeAPI] = None):
+        self.api = api or FakeAPI()
+        self.guilds: list[FakeGuild] = []
+        self._channels: dict[int, object] = {}
+        self._users: dict[int, FakeUser] = {}
+        self._waiters: list[tuple[str, object, asyncio.Future]] = []
+        self.cogs: list[object] = []
+        self.tasks: set[asyncio.Task] = set()
+        self.listener_errors: list[BaseException] = []
+
+        self.user = FakeUser(self, "Modbot", bot=True)
+        self.owner_id = new_id()
+        self.db = {
+            "prefix": {},
+            "settingup": [],
+            "guilds": {},
+            "reports": {},
+            "recent_reports": {},
+            "buttons": {}
+        }
+        self.locale_store = LocaleStore()
+        self.recently_in_report_room = {}
+        self.log_channel = None
+        self.error_channel = None
+        self.http_client = None
+
+    def track(self, coro) -> asyncio.Task:
+        """Runs a background coroutine, keeping a reference so it isn't garbage collected mid-run"""
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    def add_channel(self, channel):
+        self._channels[channel.id] = channel
+
+    def add_user(self, user: FakeUser):
+        self._users[user.id] = user
+
+    def get_guild(self, guild_id: int) -> Optional[FakeGuild]:
+        return next((g for g in self.guilds if g.id == guild_id), None)
+
+    def get_channel(self, channel_id: int):
+        return self._channels.get(channel_id)
+
+    def get_user(self, user_id: int) -> Optional[FakeUser]:
+        return self._users.get(user_id)
+
+    async def fetch_user(self, user_id: int) -> FakeUser:
+        await self.api.request("GET /users/{user_id}")
+        if user_id not in self._users:
+            raise http_error(discord.NotFound, 404, "Not Found", "Unknown User")
+        return self._users[user_id]
+
+    def get_cog(self, name: str):
+        return next((cog for cog in self.cogs if type(cog).__name__ == name), None)
+
+    def add_cog(self, cog):
+        self.cogs.append(cog)
+
+    async def wait_for(self, event: str, *, check=None, timeout: Optional[float] = None):
+        future = asyncio.get_running_loop().create_future()
+        waiter = (event, check, future)
+        self._waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def dispatch(self, event: str, *args) -> list[asyncio.Task]:
+        """Like discord.py: resolves the wait_for() calls waiting on the event, then runs each cog's on_<event>
+        listener in its own task. Returns the listener tasks so callers can time them."""
+        for waiter in list(self._waiters):
+            waiter_event, check, future = waiter
+            if waiter_event != event or future.done():
+                continue
+            try:
+                matched = check(*args) if check else True
+            except Exception as e:
+                future.set_exception(e)
+                self._waiters.remove(waiter)
+                continue
+            if matched:
+                future.set_result(args[0] if len(args) == 1 else args)
+                self._waiters.remove(waiter)
+
+        listener_tasks = []
+        for cog in self.cogs:
+            listener = getattr(cog, f"on_{event}", None)
+            if listener:
+                task = asyncio.create_task(self._run_listener(listener, *args))
+                listener_tasks.append(task)
+        return listener_tasks
+
+    async def _run_listener(self, listener, *args):
+        try:
+            await listener(*args)
+        except Exception as e:
+            self.listener_errors.append(e)
+
+    def add_report_guild(self, name: str, *, forum: bool = False, mods: int = 2) -> FakeGuild:
+        """Creates a guild with a report room setup like the _setup command does, and a few moderators"""
+        from cogs.utils import helper_functions as hf
+
+        guild = FakeGuild(self, name)
+        if forum:
+            report_channel = FakeForumChannel(self, guild, "reports", hf.FORUM_DEFAULT_TAGS)
+            meta_thread = FakeThread(self, report_channel, hf.FORUM_META_THREAD_NAME)
+            meta_thread.flags.pinned = True
+            self.db['guilds'][guild.id] = {"channel": report_channel.id, "meta_channel": meta_thread.id}
+        else:
+            report_channel = FakeTextChannel(self, guild, "reports")
+            self.db['guilds'][guild.id] = {"channel": report_channel.id}
+        guild.report_channel = report_channel
+        guild.channels.append(report_channel)
+        guild.mods = []
+        for i in range(mods):
+            mod = FakeUser(self, f"{name} mod {i + 1}")
+            self.add_user(mod)
+            guild.add_member(mod, administrator=True)
+            guild.mods.append(mod)
+        return guild
+
+    def add_reporter(self, name: str, guilds: list[FakeGuild]) -> FakeUser:
+        user = FakeUser(self, name)
+        self.add_user(user)
+        for guild in guilds:
+            guild.add_member(user)
+        return user
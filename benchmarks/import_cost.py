@@ -0,0 +1,71 @@
+"""Measures what importing parts of the bot costs: import time and resident memory in a fresh interpreter, and
+which heavy optional dependencies got loaded along the way.
+
+sumy (with nltk and numpy) is only imported inside the summarizer worker process, and the process pool itself only
+when the sumy engine is first used. This script shows that stays true: --forbid exits with 1 if any of the given
+modules is loaded by the import.
+
+Run from the bot folder:
+    python -m benchmarks.import_cost
+    python -m benchmarks.import_cost --modules cogs.utils.summarizers --forbid aiohttp sumy nltk numpy
+    python -m benchmarks.import_cost --forbid sumy nltk numpy concurrent.futures.process"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# the summarizer module on its own is what a spawned summarizer worker imports
+DEFAULT_MODULES = ["discord", "cogs.utils.summarizers", "cogs.utils.helper_functions", "cogs.modbot"]
+HEAVY_MODULES = ["aiohttp", "sumy", "nltk", "numpy", "concurrent.futures.process"]
+
+MEASURE = """
+import json, sys, time
+
+def rss():
+    with open("/proc/self/status") as read_file:
+        for line in read_file:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+
+rss_before = rss()
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "rss": rss() - rss_before, "rss_total": rss(),
+                  "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def measure(module: str, heavy: list[str]) -> dict:
+    result = subprocess.run([sys.executable, "-c", MEASURE.format(module=module, heavy=heavy)],
+                            capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr}")
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per module, the median is shown")
+    parser.add_argument("--forbid", nargs="*", default=[], help="fail if importing loads any of these modules")
+    args = parser.parse_args()
+
+    heavy = sorted(set(HEAVY_MODULES) | set(args.forbid))
+    print(f"{'module':<32} {'import ms':>10} {'RSS added':>10} {'RSS total':>10}  heavy modules loaded")
+    failed = False
+    for module in args.modules:
+        runs = [measure(module, heavy) for _ in range(args.repeat)]
+        loaded = runs[0]["loaded"]
+        print(f"{module:<32} {statistics.median(run['seconds'] for run in runs) * 1000:10.1f} "
+              f"{statistics.median(run['rss'] for run in runs) / 2 ** 20:8.1f}MB "
+              f"{statistics.median(run['rss_total'] for run in runs) / 2 ** 20:8.1f}MB  {', '.join(loaded) or '-'}")
+        if forbidden := [name for name in loaded if name in args.forbid]:
+            print(f"    {module} loads {', '.join(forbidden)}", file=sys.stderr)
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""Puts the Modbot cog under the load of many reports at once, using the offline fake in benchmarks/fake_discord.py.
+
+N simulated users spread over M guilds each open a report (picking their guild from the server_select() list when
+they share more than one guild with the bot), type, send messages with and without attachments while a moderator
+answers, and close the report with `end` (the user) or `finish` (the mod). For every load level it reports:
+    - relayed messages per second
+    - p50 / p99 relay latency (message event dispatched -> on_message() done)
+    - event loop lag (how late a 10 ms timer fires, so anything blocking the loop shows up here)
+    - API calls per relayed message
+
+Give several user counts to find where on_message(), find_current_guild() and dump_json() stop keeping up:
+throughput stops growing with the number of users while the latency and loop lag climb.
+
+Run from the bot folder:
+    python -m benchmarks.load_generator --users 10 50 100 200 --guilds 20
+    python -m benchmarks.load_generator --users 100 --guilds 5 --guilds-per-user 3 --attachment-chance 0.3"""
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import time
+
+import discord
+
+from benchmarks.fake_discord import FakeAPI, FakeAttachment, FakeBot, FakeGuild, FakeUser
+from benchmarks.relay_latency import Conversation, percentile, setup_bot, teardown_bot
+
+LOOP_LAG_INTERVAL = 0.01  # seconds between event loop lag samples
+
+
+class LoopLagMonitor:
+    """Samples how much later than asked a short sleep wakes up"""
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL):
+        self.interval = interval
+        self.samples: list[float] = []
+        self.task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    def stop(self):
+        self.task.cancel()
+
+
+class LoadConversation(Conversation):
+    """A report with randomized timing, typing and attachments"""
+    def __init__(self, bot: FakeBot, user: FakeUser, guild: FakeGuild, messages: int, finish: bool,
+                 rng: random.Random, args):
+        super().__init__(bot, user, guild, messages, finish)
+        self.rng = rng
+        self.args = args
+
+    def attachments(self) -> list[FakeAttachment]:
+        if self.rng.random() < self.args.attachment_chance:
+            return [FakeAttachment(self.bot.api, "screenshot.png", size=self.rng.randint(20_000, 500_000))]
+        return []
+
+    async def think(self):
+        if self.args.think_time:
+            await asyncio.sleep(self.rng.expovariate(1 / self.args.think_time))
+
+    async def run(self):
+        await asyncio.sleep(self.rng.uniform(0, self.args.arrival_spread))
+        self.open_time = await self.user_says(f"Hello, I'd like to report a user who is harassing me ({self.user.name})")
+        if self.user.id not in self.bot.db['reports']:
+            raise RuntimeError(f"{self.user.name} couldn't open a report")
+        # the user may have picked any of their guilds from the list
+        self.guild = self.bot.get_guild(self.bot.db['reports'][self.user.id]['guild_id'])
+
+        for i in range(self.messages):
+            await self.think()
+            if self.rng.random() < 0.5:
+                self.relay_times.append(await self.mod_says(f"Thanks, can you tell us more about that? ({i})",
+                                                            attachments=self.attachments()))
+            else:
+                self.bot.dispatch('typing', self.user.dm_channel, self.user, discord.utils.utcnow())
+                await asyncio.sleep(0.2)  # typing for a moment
+                self.relay_times.append(await self.user_says(f"They sent me rude messages yesterday evening ({i})",
+                                                             attachments=self.attachments()))
+
+        await self.think()
+        if self.finish:
+            self.close_time = await self.mod_says("finish")
+        else:
+            self.close_time = await self.user_says("end")
+
+
+async def run_level(users: int, args) -> dict:
+    """Runs one load level with a fresh bot and returns its measurements"""
+    rng = random.Random(args.seed)
+    api = FakeAPI(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                  rate_limit_chance=args.rate_limit_chance, retry_after=args.retry_after, seed=args.seed)
+    with tempfile.TemporaryDirectory(prefix="modbot_load_") as db_dir:
+        bot, guilds = await setup_bot(api, args.guilds, args.forum, db_dir)
+        conversations = []
+        for i in range(users):
+            user_guilds = rng.sample(guilds, min(args.guilds_per_user, len(guilds)))
+            user = bot.add_reporter(f"user{i + 1}", user_guilds)
+            user.guild_choice = rng.randint(1, len(user_guilds))
+            conversations.append(LoadConversation(bot, user, user_guilds[0], args.messages,
+                                                  finish=rng.random() < 0.5, rng=rng, args=args))
+
+        monitor = LoopLagMonitor()
+        monitor.start()
+        start = time.perf_counter()
+        results = await asyncio.gather(*[conversation.run() for conversation in conversations],
+                                       return_exceptions=True)
+        elapsed = time.perf_counter() - start
+        monitor.stop()
+
+        await teardown_bot(bot)
+
+    relay_times = [t for conversation in conversations for t in conversation.relay_times]
+    failed = [result for result in results if isinstance(result, BaseException)]
+    for error in failed + bot.listener_errors:
+        print(f"    error: {error!r}", file=sys.stderr)
+    lag = monitor.samples or [0.0]
+    return {
+        "users": users,
+        "relayed": len(relay_times),
+        "elapsed": elapsed,
+        "throughput": len(relay_times) / elapsed if elapsed else 0.0,
+        "p50": percentile(relay_times, 0.5) if relay_times else 0.0,
+        "p99": percentile(relay_times, 0.99) if relay_times else 0.0,
+        "lag_p99": percentile(lag, 0.99),
+        "lag_max": max(lag),
+        "api_per_msg": api.total_calls() / max(1, len(relay_times)),
+        "rate_limited": sum(api.rate_limits.values()),
+        "errors": len(failed) + len(bot.listener_errors),
+    }
+
+
+async def run(args) -> int:
+    print(f"{args.guilds} guilds, {args.guilds_per_user} guild(s) per user, {args.messages} messages per report, "
+          f"API latency {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms")
+    print(f"{'users':>6} | {'msgs/s':>7} | {'p50 ms':>8} | {'p99 ms':>8} | {'lag p99':>8} | {'lag max':>8} | "
+          f"{'API/msg':>7} | {'429s':>5} | {'errors':>6}")
+    errors = 0
+    for users in args.users:
+        level = await run_level(users, args)
+        errors += level["errors"]
+        print(f"{level['users']:6d} | {level['throughput']:7.1f} | {level['p50'] * 1000:8.1f} | "
+              f"{level['p99'] * 1000:8.1f} | {level['lag_p99'] * 1000:8.1f} | {level['lag_max'] * 1000:8.1f} | "
+              f"{level['api_per_msg']:7.1f} | {level['rate_limited']:5d} | {level['errors']:6d}")
+    return 1 if errors else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[10, 50, 100], help="one load level per number")
+    parser.add_argument("--guilds", type=int, default=10)
+    parser.add_argument("--guilds-per-user", type=int, default=1, help="guilds each user shares with the bot")
+    parser.add_argument("--messages", type=int, default=10, help="messages relayed per report")
+    parser.add_argument("--attachment-chance", type=float, default=0.2)
+    parser.add_argument("--think-time", type=float, default=0.5, help="mean seconds between messages")
+    parser.add_argument("--arrival-spread", type=float, default=2.0, help="seconds over which users show up")
+    parser.add_argument("--forum", action="store_true", help="use forum channels as the report rooms")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--rate-limit-chance", type=float, default=0.0, help="chance of a request getting a 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="seconds a 429 makes a request wait")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == '__main__':
+    main()
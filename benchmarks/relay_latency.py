@@ -0,0 +1,177 @@
+"""Measures the relay path of the Modbot cog (DM -> report thread and back) against the offline fake in
+benchmarks/fake_discord.py.
+
+Each simulated user opens a report by DMing the bot (going through server_select() and the report type buttons),
+exchanges messages with a moderator, and then ends the report. The time from a message event being dispatched to
+on_message() finishing is the relay latency of that message.
+
+Run from the bot folder:
+    python -m benchmarks.relay_latency
+    python -m benchmarks.relay_latency --users 20 --messages 30 --latency-ms 80 --rate-limit-chance 0.01
+    python -m benchmarks.relay_latency --max-p99-ms 500   # exits with 1 if the p99 relay latency is higher
+
+Nothing is sent to Discord, and the database is written to a temporary folder instead of the bot folder.
+With --trace, the report spans are written to a file that benchmarks/trace_report.py can break down."""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.fake_discord import FakeAPI, FakeBot, FakeGuild, FakeMessage, FakeUser
+from cogs.utils import helper_functions as hf
+from cogs.utils import tracing
+
+TEARDOWN_TIMEOUT = 30  # seconds to wait for the summary workers to finish and then to stop
+
+
+def percentile(timings: list[float], fraction: float) -> float:
+    timings = sorted(timings)
+    return timings[min(len(timings) - 1, int(len(timings) * fraction))]
+
+
+def describe(timings: list[float]) -> str:
+    if not timings:
+        return "no samples"
+    return (f"p50 {statistics.median(timings) * 1000:8.1f} ms | p95 {percentile(timings, 0.95) * 1000:8.1f} ms | "
+            f"p99 {percentile(timings, 0.99) * 1000:8.1f} ms | max {max(timings) * 1000:8.1f} ms")
+
+
+async def setup_bot(api: FakeAPI, guild_count: int, forum: bool, db_dir: str) -> tuple[FakeBot, list[FakeGuild]]:
+    """Makes a fake bot with the Modbot cog loaded and guild_count guilds with report rooms"""
+    from cogs.modbot import Modbot
+
+    hf.dir_path = db_dir  # dump_json() writes the db here instead of the bot folder
+    bot = FakeBot(api)
+    hf.here.bot = None  # hf.setup() keeps the first bot it's given, and each run gets a fresh one
+    hf.setup(bot=bot, loop=asyncio.get_running_loop())
+    bot.add_cog(Modbot(bot))
+    guilds = [bot.add_report_guild(f"Guild {i + 1}", forum=forum) for i in range(guild_count)]
+    return bot, guilds
+
+
+async def teardown_bot(bot: FakeBot, timeout: float = TEARDOWN_TIMEOUT):
+    """Waits for queued summaries and a save that's still running, then stops the summary workers, before the db
+    folder is deleted. Raises TimeoutError if a worker is stuck, rather than hanging the benchmark."""
+    await asyncio.wait_for(bot.summary_queue.join(), timeout)
+    async with hf.here.dump_json_lock:
+        pass
+    for task in bot.summary_workers:
+        task.cancel()
+    await asyncio.wait_for(asyncio.gather(*bot.summary_workers, return_exceptions=True), timeout)
+
+
+async def timed_dispatch(bot: FakeBot, msg: FakeMessage) -> float:
+    """Dispatches a message event and returns how long on_message() took to handle it"""
+    start = time.perf_counter()
+    await asyncio.gather(*bot.dispatch('message', msg))
+    return time.perf_counter() - start
+
+
+class Conversation:
+    """One user's report: opening it, some back and forth with a mod, and closing it"""
+    def __init__(self, bot: FakeBot, user: FakeUser, guild: FakeGuild, messages: int, finish: bool = False):
+        self.bot = bot
+        self.user = user
+        self.guild = guild
+        self.messages = messages
+        self.finish = finish
+        self.open_time = 0.0
+        self.close_time = 0.0
+        self.relay_times: list[float] = []
+
+    async def user_says(self, content: str, **kwargs) -> float:
+        dm_channel = await self.user.create_dm()
+        msg = FakeMessage(self.bot, dm_channel, self.user, content, **kwargs)
+        dm_channel.messages.append(msg)
+        return await timed_dispatch(self.bot, msg)
+
+    async def mod_says(self, content: str, **kwargs) -> float:
+        thread = self.bot.get_channel(self.bot.db['reports'][self.user.id]['thread_id'])
+        mod = self.guild.get_member(self.guild.mods[0].id)
+        msg = FakeMessage(self.bot, thread, mod, content, **kwargs)
+        thread.messages.append(msg)
+        return await timed_dispatch(self.bot, msg)
+
+    async def run(self):
+        self.open_time = await self.user_says(f"Hello, I'd like to report a user who is harassing me ({self.user.name})")
+        if self.user.id not in self.bot.db['reports']:
+            raise RuntimeError(f"{self.user.name} couldn't open a report")
+
+        for i in range(self.messages):
+            if i % 2:
+                self.relay_times.append(await self.mod_says(f"Thanks for the report, can you tell us more? ({i})"))
+            else:
+                self.relay_times.append(await self.user_says(f"They sent me rude messages yesterday evening ({i})"))
+
+        if self.finish:
+            self.close_time = await self.mod_says("finish")
+        else:
+            self.close_time = await self.user_says("end")
+
+
+async def run(args) -> int:
+    api = FakeAPI(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                  rate_limit_chance=args.rate_limit_chance, retry_after=args.retry_after, seed=args.seed)
+    with tempfile.TemporaryDirectory(prefix="modbot_bench_") as db_dir:
+        bot, guilds = await setup_bot(api, args.guilds, args.forum, db_dir)
+        conversations = []
+        for i in range(args.users):
+            guild = guilds[i % len(guilds)]
+            user = bot.add_reporter(f"user{i + 1}", [guild])
+            conversations.append(Conversation(bot, user, guild, args.messages, finish=bool(i % 2)))
+
+        start = time.perf_counter()
+        await asyncio.gather(*[conversation.run() for conversation in conversations])
+        elapsed = time.perf_counter() - start
+
+        await teardown_bot(bot)
+        await tracing.flush()
+
+    relay_times = [t for conversation in conversations for t in conversation.relay_times]
+    print(f"{args.users} users, {args.guilds} guilds, {args.messages} messages each, "
+          f"API latency {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms")
+    print(f"    open report   {describe([c.open_time for c in conversations])}")
+    print(f"    relay         {describe(relay_times)}")
+    print(f"    close report  {describe([c.close_time for c in conversations])}")
+    print(f"    throughput    {len(relay_times) / elapsed:.1f} relayed messages/s ({elapsed:.2f}s total)")
+    print(f"    API calls     {api.total_calls()} ({api.total_calls() / max(1, len(relay_times)):.1f} per relayed "
+          f"message), {sum(api.rate_limits.values())} rate limited")
+    if args.routes:
+        for route, count in api.calls.most_common():
+            print(f"        {count:6d}  {route}")
+    for error in bot.listener_errors:
+        print(f"    listener error: {error!r}", file=sys.stderr)
+
+    if bot.listener_errors:
+        return 1
+    if args.max_p99_ms and relay_times and percentile(relay_times, 0.99) * 1000 > args.max_p99_ms:
+        print(f"p99 relay latency is over {args.max_p99_ms} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--guilds", type=int, default=1)
+    parser.add_argument("--messages", type=int, default=20, help="messages relayed per report")
+    parser.add_argument("--forum", action="store_true", help="use forum channels as the report rooms")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--rate-limit-chance", type=float, default=0.0, help="chance of a request getting a 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="seconds a 429 makes a request wait")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--routes", action="store_true", help="list the API calls made per route")
+    parser.add_argument("--max-p99-ms", type=float, default=0.0, help="fail if the p99 relay latency is higher")
+    parser.add_argument("--trace", help="append the report spans to this jsonl file")
+    args = parser.parse_args()
+    if args.trace:
+        os.environ["TRACE_FILE"] = os.path.abspath(args.trace)
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Measures how long each summarizer engine takes to summarize report-sized text.
+
+Run from the bot folder:
+    python -m benchmarks.summarize_latency
+    python -m benchmarks.summarize_latency --engines sumy eden --runs 20
+
+The eden engine is only run if EDEN_KEY is set (it makes real API requests)."""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+from cogs.utils.http_client import HTTPClient
+from cogs.utils.summarizers import ENGINES, make_summarizer
+
+dir_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+SENTENCES = [
+    "A user in the general channel keeps sending me insulting messages",
+    "I tried to block them but they keep joining with new accounts",
+    "They also posted my picture in the voice channel chat without asking",
+    "Some other members saw it and started laughing at me",
+    "I have screenshots of everything if the mods need them",
+    "This has been happening for about a week now",
+    "I don't want to leave the server because I like studying here",
+    "Could you please look at the messages from yesterday evening",
+    "Someone told me that the same person was banned before",
+    "I just want it to stop so I can practice my Spanish in peace",
+]
+
+
+def make_report_text(seed: int, length: int = 500) -> str:
+    """Builds text like the start of a report thread, the same way log_record_of_report() trims it"""
+    rng = random.Random(seed)
+    text = ""
+    while len(text) < length:
+        text += rng.choice(SENTENCES) + ". "
+    return text[:length]
+
+
+def describe(timings: list[float]) -> str:
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return (f"min {timings[0] * 1000:8.1f} ms | median {statistics.median(timings) * 1000:8.1f} ms | "
+            f"p95 {p95 * 1000:8.1f} ms | max {timings[-1] * 1000:8.1f} ms")
+
+
+async def benchmark_engine(engine_name: str, runs: int, http_client: HTTPClient):
+    summarizer = make_summarizer(engine_name, http_client)
+    try:
+        # the first call pays for starting the process pool / importing sumy, so report it separately
+        start = time.perf_counter()
+        await summarizer.summarize(make_report_text(-1))
+        first_call = time.perf_counter() - start
+
+        uncached = []
+        for i in range(runs):
+            start = time.perf_counter()
+            await summarizer.summarize(make_report_text(i))
+            uncached.append(time.perf_counter() - start)
+
+        cached = []
+        for i in range(runs):
+            start = time.perf_counter()
+            await summarizer.summarize(make_report_text(i))
+            cached.append(time.perf_counter() - start)
+    finally:
+        summarizer.close()
+
+    print(f"{engine_name}:")
+    print(f"    first call  {first_call * 1000:.1f} ms")
+    print(f"    uncached    {describe(uncached)}")
+    print(f"    cached      {describe(cached)}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    load_dotenv(f"{dir_path}/.env")
+    http_client = HTTPClient()
+    await http_client.start()
+    try:
+        for engine_name in args.engines:
+            if engine_name == "eden" and not os.getenv("EDEN_KEY"):
+                print("eden: skipped (no EDEN_KEY)")
+                continue
+            await benchmark_engine(engine_name, args.runs, http_client)
+    finally:
+        await http_client.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""Breaks down the report spans written to TRACE_FILE (see cogs/utils/tracing.py) by where the time went.
+
+For every trace with the given root span (report_open by default), each moment between its start and end is
+attributed to the deepest span running at that moment, and that span's category: "user" (waiting for the user to
+answer), "rai" (waiting for Rai's modlog), "db" (saving the database), "pause" (deliberate sleeps) or "api"
+(everything else, mostly Discord API calls). The slowest traces are listed with the split, followed by the timings
+of each stage.
+
+Run from the bot folder:
+    python -m benchmarks.trace_report traces.jsonl
+    python -m benchmarks.trace_report traces.jsonl --root relay --slowest 20"""
+import argparse
+import json
+import statistics
+from collections import defaultdict
+
+from cogs.utils.tracing import CATEGORIES
+
+
+def load_traces(path: str) -> dict[str, list[dict]]:
+    traces = defaultdict(list)
+    with open(path, "r") as read_file:
+        for line in read_file:
+            if line.strip():
+                span = json.loads(line)
+                traces[span["trace_id"]].append(span)
+    return traces
+
+
+def depths(spans: list[dict]) -> dict[str, int]:
+    by_id = {span["span_id"]: span for span in spans}
+    result = {}
+    for span in spans:
+        depth, parent_id = 0, span["parent_span_id"]
+        while parent_id in by_id:
+            depth += 1
+            parent_id = by_id[parent_id]["parent_span_id"]
+        result[span["span_id"]] = depth
+    return result
+
+
+def breakdown(root: dict, spans: list[dict]) -> dict[str, float]:
+    """Milliseconds of the root span spent in each category"""
+    span_depths = depths(spans)
+    start, end = root["start_time_unix_nano"], root["end_time_unix_nano"]
+    bounds = sorted({start, end} | {t for span in spans for t in (span["start_time_unix_nano"],
+                                                                   span["end_time_unix_nano"]) if start < t < end})
+    result = dict.fromkeys(CATEGORIES, 0.0)
+    for left, right in zip(bounds, bounds[1:]):
+        running = [span for span in spans
+                   if span["start_time_unix_nano"] <= left and span["end_time_unix_nano"] >= right]
+        deepest = max(running, key=lambda span: (span_depths[span["span_id"]], span["start_time_unix_nano"]))
+        result[deepest["attributes"].get("category", "api")] += (right - left) / 1e6
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file", help="the TRACE_FILE of the bot")
+    parser.add_argument("--root", default="report_open", help="name of the root spans to break down")
+    parser.add_argument("--slowest", type=int, default=10, help="number of traces listed")
+    args = parser.parse_args()
+
+    rows = []
+    stage_times = defaultdict(list)
+    for spans in load_traces(args.file).values():
+        root = next((span for span in spans if span["parent_span_id"] is None and span["name"] == args.root), None)
+        if root is None:
+            continue
+        rows.append((root, breakdown(root, spans)))
+        for span in spans:
+            stage_times[span["name"]].append(span["duration_ms"])
+
+    if not rows:
+        print(f"No {args.root} traces in {args.file}")
+        return
+
+    print(f"{len(rows)} {args.root} traces, the {min(args.slowest, len(rows))} slowest:")
+    print(f"{'total ms':>10} | " + " | ".join(f"{category + ' ms':>9}" for category in CATEGORIES) +
+          f" | {'report ID':>20} | status")
+    rows.sort(key=lambda row: row[0]["duration_ms"], reverse=True)
+    for root, split in rows[:args.slowest]:
+        print(f"{root['duration_ms']:10.1f} | " + " | ".join(f"{split[category]:9.1f}" for category in CATEGORIES) +
+              f" | {str(root['attributes'].get('report_id', '-')):>20} | {root['status']}")
+
+    print("\nStages:")
+    print(f"{'span':<36} {'count':>6} {'p50 ms':>10} {'max ms':>10}")
+    for name, timings in sorted(stage_times.items(), key=lambda item: sum(item[1]), reverse=True):
+        print(f"{name:<36} {len(timings):6d} {statistics.median(timings):10.1f} {max(timings):10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -33,6 +33,7 @@ INSTRUCTIONS = '\n'.join(INSTRUCTIONS)
 
 SP_SERV_ID = 243838819743432704
 RY_TEST_SERV_ID = 275146036178059265
+REPORT_BUTTON_CUSTOM_ID = "modbot:report_button"
 
 
 async def reinitialize_buttons(admin):
@@ -47,19 +48,18 @@ async def reinitialize_buttons(admin):
     # 'report_button': {554572239836545074: 1233599933563666462, 774660366620950538: 1233601399024124026},
     # 'main_start_button': {985967093411368981: 1233600929740230667}
     # }
+    # The view itself is registered in cog_load(), this only edits old messages without a fixed custom_id
     await admin.bot.wait_until_ready()
-    for button_name, button_dict in admin.bot.db.get('buttons', {}).items():
-        if button_name == 'report_button':
-            for channel_id, msg_id in button_dict.items():
-                print(f"Setting up report button for {channel_id=}, {msg_id=}")
-                await admin.setup_report_button_view(channel_id, msg_id)
-        
-        
+    await hf.reconcile_button_messages(['report_button'], admin.setup_report_button_view)
+
+
 class Admin(commands.Cog):
     def __init__(self, bot):
         self.bot: commands.Bot = bot
         
     async def cog_load(self):
+        # persistent view, matched to button presses by custom_id without fetching any messages
+        self.bot.add_view(self.build_report_button_view())
         utils.asyncio_task(reinitialize_buttons, self)
 
     async def cog_check(self, ctx):
@@ -243,21 +243,32 @@ class Admin(commands.Cog):
         #     await cog.start_report_room(button_interaction.user, guild, msg=None,
         #                                 report_room_type=report_room_type, ban_appeal=False)
 
-    async def setup_report_button_view(self,
-                                       channel_id: int,
-                                       msg_id: int = None) -> Optional[discord.Message]:
+    def build_report_button_view(self) -> utils.RaiView:
         button_text = "Start report or support ticket"
-        button = discord.ui.Button(label=button_text, style=discord.ButtonStyle.primary)
-        
+        button = discord.ui.Button(label=button_text, style=discord.ButtonStyle.primary,
+                                   custom_id=REPORT_BUTTON_CUSTOM_ID)
+
         button.callback = self.report_button_callback
         view = utils.RaiView(timeout=None)
         view.add_item(button)
-        
+        return view
+
+    async def setup_report_button_view(self,
+                                       channel_id: int,
+                                       msg_id: int = None) -> Optional[discord.Message]:
+        view = self.build_report_button_view()
+
         channel = self.bot.get_channel(channel_id)
+        if not channel:
+            return None
         if msg_id:
-            to_edit_msg = await channel.fetch_message(msg_id)
+            try:
+                to_edit_msg = await channel.fetch_message(msg_id)
+            except discord.NotFound:
+                to_edit_msg = None
             if to_edit_msg:
                 msg = await to_edit_msg.edit(view=view)
+                hf.mark_button_persistent(msg.id)
                 return msg
             else:
                 return None
@@ -270,6 +281,7 @@ class Admin(commands.Cog):
             # set up button ID for reaction handling
             self.bot.db['buttons'].setdefault("report_button", {})
             self.bot.db['buttons']["report_button"][channel.id] = msg.id
+            hf.mark_button_persistent(msg.id)
         
         return msg
         
@@ -1,4 +1,6 @@
 import os
+from typing import Optional
+
 import discord
 from discord.ext import commands
 from .unbans import Unbans
@@ -8,11 +10,15 @@ from .admin import Admin
 class Events(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot: commands.Bot = bot
+        self.ban_appeals_guild_id = int(os.getenv("BAN_APPEALS_GUILD_ID") or 0)
+        # guild_id -> roles in the ban appeals guild named after that guild, built on first use
+        self.guild_roles: Optional[dict[int, list[discord.Role]]] = None
         
     @commands.Cog.listener()
     async def on_interaction(self, interaction: discord.Interaction):
         """This is to record the languages of users."""
-        self.bot.db['user_localizations'][interaction.user.id] = str(interaction.locale)[:2]
+        # only marks the store as needing a save if the user's locale actually changed
+        self.bot.locale_store.set(interaction.user.id, interaction.locale)
         
         #         def check_for_button_press(i):
         #             return i.type == discord.InteractionType.component and \
@@ -103,18 +109,50 @@ class Events(commands.Cog):
         await self.bot.get_user(self.bot.owner_id).send("Channels: \n" +
                                                         '\n'.join([channel.name for channel in guild.channels]))
         
+    def build_guild_role_map(self) -> dict[int, list[discord.Role]]:
+        """Builds a map of guild ID -> roles in the ban appeals guild whose name starts with that ID"""
+        guild_roles = {}
+        ban_appeals_guild = self.bot.get_guild(self.ban_appeals_guild_id)
+        if not ban_appeals_guild:
+            return guild_roles
+        for role in ban_appeals_guild.roles:
+            # most role names will be named after a guild ID
+            try:
+                guild_id = int(role.name.split('_')[0])
+            except ValueError:
+                continue
+            guild_roles.setdefault(guild_id, []).append(role)
+        self.guild_roles = guild_roles
+        return guild_roles
+
+    def get_guild_roles(self) -> dict[int, list[discord.Role]]:
+        if self.guild_roles is None:
+            return self.build_guild_role_map()
+        return self.guild_roles
+
     @commands.Cog.listener()
-    async def on_member_join(self, member: discord.Member):
-        ban_appeals_guild_id = int(os.getenv("BAN_APPEALS_GUILD_ID") or 0)
-        if not ban_appeals_guild_id:
-            return
+    async def on_guild_role_create(self, role: discord.Role):
+        if role.guild.id == self.ban_appeals_guild_id:
+            self.guild_roles = None  # rebuilt on next use
 
-        ban_appeals_guild = self.bot.get_guild(ban_appeals_guild_id)
-        if not ban_appeals_guild:
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        if role.guild.id == self.ban_appeals_guild_id:
+            self.guild_roles = None
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        if after.guild.id == self.ban_appeals_guild_id and before.name != after.name:
+            self.guild_roles = None
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        # this runs for joins in every guild, so leave before doing anything for the ones that don't matter
+        if not self.ban_appeals_guild_id or member.guild.id != self.ban_appeals_guild_id:
             return
 
+        ban_appeals_guild = member.guild
         servers_category = discord.utils.find(lambda c: c.name.casefold() == 'servers', ban_appeals_guild.categories)
-        guild_id_to_role_dict: dict[int, discord.Role] = {}
         if not servers_category:
             return
         
@@ -122,13 +160,7 @@ class Events(commands.Cog):
         if not server_moderator_role:
             return
         
-        for role in ban_appeals_guild.roles:
-            # most role names will be named after a guild ID
-            try:
-                guild_id = int(role.name.split('_')[0])
-            except ValueError:
-                continue
-            
+        for guild_id, roles in self.get_guild_roles().items():
             # try to get guild matching the name of the role
             guild = self.bot.get_guild(guild_id)
             if not guild:
@@ -141,17 +173,17 @@ class Events(commands.Cog):
             # if they have admin or manage_guild, assign them the role corresponding to their guild they moderate
             perms = member_in_guild.guild_permissions
             if perms.administrator or perms.manage_guild:
-                try:
-                    await member.add_roles(role, server_moderator_role)
-                    await member.send("I've given you special access to the appeals channel for your server. Normally "
-                                      "users will only be able to see this if they are banned on your server. If you "
-                                      "wish, you can send a message to this channel and it will overwrite the "
-                                      "previous appeals instructions message in the server (ask Ryan if you want to " 
-                                      "recover an old message).")
-                except (discord.Forbidden, discord.HTTPException):
-                    continue            
+                for role in roles:
+                    try:
+                        await member.add_roles(role, server_moderator_role)
+                        await member.send("I've given you special access to the appeals channel for your server. "
+                                          "Normally users will only be able to see this if they are banned on your "
+                                          "server. If you wish, you can send a message to this channel and it will "
+                                          "overwrite the previous appeals instructions message in the server (ask "
+                                          "Ryan if you want to recover an old message).")
+                    except (discord.Forbidden, discord.HTTPException):
+                        continue            
             
 
 async def setup(bot):
     await bot.add_cog(Events(bot))
-    
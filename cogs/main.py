@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import os
 
@@ -7,6 +8,9 @@ import sys
 
 from cogs.utils.BotUtils import bot_utils as utils
 from .utils import helper_functions as hf
+from .utils import tracing
+from .utils.loop_monitor import LoopMonitor, name_command_task
+from .utils.startup_profile import profile
 
 
 class Main(commands.Cog):
@@ -15,12 +19,23 @@ class Main(commands.Cog):
         self.bot.tree.on_error = on_tree_error
         self.bot.on_error = self.on_error
         self.autosave_db.start()
+        self.daily_cleanup.start()
+        self.loop_report.start()
+
+        # kept on the bot so reloading this cog doesn't start a second watchdog
+        if not hasattr(self.bot, "loop_monitor"):
+            self.bot.loop_monitor = LoopMonitor()
+            self.bot.loop_monitor.start(asyncio.get_running_loop())
+            self.bot.before_invoke(name_command_task)
 
     def cog_unload(self):
         self.autosave_db.cancel()
+        self.daily_cleanup.cancel()
+        self.loop_report.cancel()
     
     @commands.Cog.listener()
     async def on_ready(self):
+        profile.checkpoint("gateway connect until on_ready")
         print("Bot loaded")
         self.bot.log_channel = self.bot.get_channel(int(os.getenv("LOG_CHANNEL_ID")))
         self.bot.error_channel = self.bot.get_channel(int(os.getenv("TRACEBACK_LOGGING_CHANNEL")))
@@ -48,13 +63,35 @@ class Main(commands.Cog):
         if 'recent_reports' not in self.bot.db:
             self.bot.db['recent_reports'] = {}
 
+        profile.checkpoint("Main.on_ready")
+        await profile.finish()  # writes startup_profile.txt when profiling startup
+
     @tasks.loop(minutes=1)
     async def autosave_db(self):
         await hf.dump_json()
+        await tracing.flush()  # write the report spans finished in the last minute, if TRACE_FILE is set
 
     @autosave_db.before_loop
     async def before_autosave_db(self):
         await self.bot.wait_until_ready()
+
+    @tasks.loop(hours=24)
+    async def daily_cleanup(self):
+        # the next autosave will write the locale file if any users were removed
+        self.bot.locale_store.expire()
+        hf.expire_old_recent_reports()
+
+    @tasks.loop(hours=1)
+    async def loop_report(self):
+        """Posts what blocked the event loop in the last hour, if anything did"""
+        if self.bot.log_channel and self.bot.loop_monitor.worth_reporting():
+            await self.bot.log_channel.send(self.bot.loop_monitor.summary())
+        self.bot.loop_monitor.reset()
+
+    @loop_report.before_loop
+    async def before_loop_report(self):
+        await self.bot.wait_until_ready()
+        await asyncio.sleep(3600)  # the first report is an hour after startup
     
     @commands.Cog.listener()
     async def on_error(self, event: str, *args, **kwargs):
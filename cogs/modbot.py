@@ -1,8 +1,9 @@
 import asyncio
+import functools
 import logging
 import os
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from textwrap import dedent
 from typing import Optional, Union
@@ -13,6 +14,7 @@ from discord.ext import commands
 
 from .utils.db_utils import get_thread_id_to_thread_info
 from .utils import helper_functions as hf
+from .utils import api_usage, metrics, tracing
 # from cogs.utils.BotUtils import bot_utils as utils
 
 dir_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
@@ -37,17 +39,27 @@ logger = logging.getLogger(__name__)
 #             "mod_role": 123459535977955330,
 #         },
 #     },
-#     "user_localizations": {
-#         "123446036178059265": "en-US"
-#     },
 # }
+# user locales are stored separately in user_localizations.json, see cogs/utils/locale_store.py
 
 SP_SERV_ID = 243838819743432704
 JP_SERV_ID = 189571157446492161
+AUDIT_LOG_BATCH_DELAY = 1.0  # seconds to collect thread archive events before checking the audit log
+
+RELAYED_MESSAGES = metrics.counter("modbot_relayed_messages_total",
+                                   "Messages relayed between users and report threads", ("direction",))
+SEND_MESSAGE_SECONDS = metrics.histogram("modbot_send_message_seconds",
+                                         "Time taken by send_message() to relay a message", ("direction",))
+TYPING_RATE_LIMITED = metrics.counter("modbot_typing_rate_limited_total",
+                                      "Typing indicators skipped because the typing endpoint returned a 429")
+
+
+def relay_direction(open_report: 'OpenReport') -> str:
+    return "to_user" if isinstance(open_report.dest, discord.DMChannel) else "to_mods"
 
 
 async def _send_typing_notif(self, channel, user):
-    if type(channel) != discord.DMChannel:
+    if not isinstance(channel, discord.DMChannel):
         return
     reports = self.bot.db['reports']
     if user.id in reports:
@@ -61,6 +73,7 @@ async def _send_typing_notif(self, channel, user):
         return
 
 
+@api_usage.for_feature("typing")
 async def _safe_typing(channel):
     """Send a typing indicator without allowing typing endpoint failures to interrupt flow."""
     if channel is None:
@@ -69,6 +82,7 @@ async def _safe_typing(channel):
         await channel.typing()
     except discord.HTTPException as err:
         if err.status == 429:
+            TYPING_RATE_LIMITED.inc()
             logger.debug("Typing indicator request was rate limited for channel %s", getattr(channel, "id", None))
             return
         raise
@@ -83,12 +97,21 @@ class OpenReport:
     dest: Union[discord.Thread, discord.DMChannel]
 
 
+@dataclass
+class AuditLogBatch:
+    future: asyncio.Future  # resolves to the set of thread IDs I archived
+    thread_ids: set[int] = field(default_factory=set)
+
+
 class Modbot(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot: commands.Bot = bot
         # dict w/ key ID and value of last left report room time
         if not hasattr(self.bot, "recently_in_report_room"):
             self.bot.recently_in_report_room = {}
+        # guild_id -> audit log lookup currently waiting to be sent, see was_archived_by_me()
+        self.audit_log_batches: dict[int, AuditLogBatch] = {}
+        self.audit_log_tasks: set[asyncio.Task] = set()  # references to the lookups, so they aren't collected
 
     # main code is here
     @commands.Cog.listener()
@@ -122,8 +145,12 @@ class Modbot(commands.Cog):
         # can be None if the above message was not sent to one of the open report threads in a server: i.e., it's
         # a random unrelated message in a server in a random channel
         if open_report:
+            direction = relay_direction(open_report)
             try:
-                await self.send_message(msg, open_report)
+                with SEND_MESSAGE_SECONDS.time(direction=direction), api_usage.feature("relay"), \
+                        tracing.trace("relay", report_id=open_report.thread_info['thread_id'],
+                                      guild_id=open_report.thread_info['guild_id'], direction=direction):
+                    await self.send_message(msg, open_report)
             except Exception:
                 await self.end_report(open_report, error=True)
                 raise
@@ -160,32 +187,35 @@ class Modbot(commands.Cog):
         # at this point they should be cleared to join a new report
         # try to put user into report room
         else:
-            guild: discord.Guild
-            report_room_type: str  # "main" means main report room, "secondary" means secondary report room, "voice" means voice report room
-            try:  # the user selects to which server they want to connect
-                self.bot.db['settingup'].append(msg.author.id)
-                guild, report_room_type = await self.server_select(msg)
-            except Exception:
-                self.bot.db['settingup'].remove(msg.author.id)
-                await msg.author.send("WARNING: There's been an error. Setup will not continue.")
-                raise
-
-            # they've selected a server to make a report to, put them in that server's report room
-            try:
+            with tracing.trace("report_open", user_id=msg.author.id), api_usage.feature("report_open"):
+                guild: discord.Guild
+                report_room_type: str  # "main" means main report room, "secondary" means secondary report room, "voice" means voice report room
+                try:  # the user selects to which server they want to connect
+                    self.bot.db['settingup'].append(msg.author.id)
+                    guild, report_room_type = await self.server_select(msg)
+                except Exception:
+                    self.bot.db['settingup'].remove(msg.author.id)
+                    await msg.author.send("WARNING: There's been an error. Setup will not continue.")
+                    raise
                 if guild:
-                    # check if they have been blocked by the /block command
-                    if report_room_type == "BLOCKED_USER":
-                        return "BLOCKED_USER"
-
-                    # assuming they haven't been blocked, continue here
-                    await self.start_report_room(msg.author, guild, msg,
-                                                 report_room_type)  # bring user to report room
-                return "UserPassedThrough"  # if it worked
-            except Exception:
-                await msg.author.send("WARNING: There's been an error. Setup will not continue.")
-                raise
-            finally:
-                self.bot.db['settingup'].remove(msg.author.id)
+                    tracing.set_trace_attributes(guild_id=guild.id, report_room_type=report_room_type)
+
+                # they've selected a server to make a report to, put them in that server's report room
+                try:
+                    if guild:
+                        # check if they have been blocked by the /block command
+                        if report_room_type == "BLOCKED_USER":
+                            return "BLOCKED_USER"
+
+                        # assuming they haven't been blocked, continue here
+                        await self.start_report_room(msg.author, guild, msg,
+                                                     report_room_type)  # bring user to report room
+                    return "UserPassedThrough"  # if it worked
+                except Exception:
+                    await msg.author.send("WARNING: There's been an error. Setup will not continue.")
+                    raise
+                finally:
+                    self.bot.db['settingup'].remove(msg.author.id)
 
     # for finding out which report session a certain message belongs to, None if not part of anything
     # we should only be here if a user is for sure in the report room
@@ -285,11 +315,13 @@ class Modbot(commands.Cog):
             return OpenReport(thread_info, current_user, report_thread, source, report_thread)
 
     # for first entering a user into the report room
+    @tracing.traced()
     async def server_select(self, msg: discord.Message) -> Union[tuple[None, None], tuple[discord.Guild, str]]:
         """From the entry message into the DMs by a user, ask them which server they want to connect to, and return
         a guild object."""
+        # guild.get_member() is a dict lookup, "msg.author in g.members" was a linear scan of every member list
         shared_guilds = sorted(
-            [g for g in self.bot.guilds if msg.author in g.members], key=lambda x: x.name)
+            [g for g in self.bot.guilds if g.get_member(msg.author.id)], key=lambda x: x.name)
 
         appeals_server = self.bot.get_guild(int(os.getenv("BAN_APPEALS_GUILD_ID") or 0))
         if appeals_server in shared_guilds:
@@ -357,9 +389,10 @@ class Modbot(commands.Cog):
                 except AttributeError:
                     return None, None
                 try:
-                    resp = await self.bot.wait_for('message',
-                                                   check=lambda m: m.author == msg.author and m.channel == msg.channel,
-                                                   timeout=60.0)
+                    with tracing.span("wait_for_guild_choice", category="user"):
+                        resp = await self.bot.wait_for('message',
+                                                       check=lambda m: m.author == msg.author and m.channel == msg.channel,
+                                                       timeout=60.0)
                 except asyncio.TimeoutError:
                     try:
                         await conf.delete()
@@ -402,6 +435,7 @@ class Modbot(commands.Cog):
         guild, report_room_type = await self.ask_report_type(msg.author, guild)
         return guild, report_room_type
 
+    @tracing.traced()
     async def ask_report_type(self, author: Union[discord.User, discord.Member],
                               guild: discord.Guild) -> Union[tuple[None, None], tuple[Guild, str]]:
         """After a user selects a server, this function will ask them which kind of report they want to make"""
@@ -420,7 +454,8 @@ class Modbot(commands.Cog):
                                                    server_q_button.custom_id, cancel_button.custom_id]
 
         try:
-            interaction = await self.bot.wait_for("interaction", timeout=180.0, check=check_for_button_press)
+            with tracing.span("wait_for_report_type", category="user"):
+                interaction = await self.bot.wait_for("interaction", timeout=180.0, check=check_for_button_press)
         except asyncio.TimeoutError:
             return None, None  # no button pressed
         else:
@@ -444,6 +479,7 @@ class Modbot(commands.Cog):
             final_room_type = await self.ask_voice_channel_question(author, initial_room_type)
             return guild, final_room_type
     
+    @tracing.traced()
     async def ask_voice_channel_question(self, author: Union[discord.User, discord.Member], 
                                          initial_room_type: str) -> str:
         """Ask the user if their report is related to voice channels"""
@@ -481,7 +517,9 @@ class Modbot(commands.Cog):
                    i.data.get("custom_id", "") in [yes_button.custom_id, no_button.custom_id]
         
         try:
-            interaction = await self.bot.wait_for("interaction", timeout=180.0, check=check_for_voice_button_press)
+            with tracing.span("wait_for_voice_answer", category="user"):
+                interaction = await self.bot.wait_for("interaction", timeout=180.0,
+                                                      check=check_for_voice_button_press)
         except asyncio.TimeoutError:
             # If timeout, default to the initial room type
             try:
@@ -505,6 +543,7 @@ class Modbot(commands.Cog):
             else:
                 return initial_room_type
             
+    @tracing.traced(starts_trace=True)
     async def start_ban_appeal_room(self, author: discord.User, guild: discord.Guild,
                                     appeal_text: str, report_room_type: str):
         try:
@@ -516,6 +555,7 @@ class Modbot(commands.Cog):
             await hf.check_bot_perms(report_channel, meta_channel, guild, author)
         except hf.EndEarly:
             return
+        @tracing.traced()
         async def open_room():
             if not author.dm_channel:
                 await author.create_dm()
@@ -523,11 +563,13 @@ class Modbot(commands.Cog):
                 await _safe_typing(report_channel)
 
             await _safe_typing(author.dm_channel)
-            await asyncio.sleep(1)
+            with tracing.span("typing_pause", category="pause"):
+                await asyncio.sleep(1)
 
             try:
                 report_thread = await hf.create_report_thread(author, appeal_text,
                                                               report_channel, ban_appeal=True)
+                tracing.set_trace_attributes(report_id=report_thread.id)
 
                 # try to capture the modlog that rai will post, delete it, and repost it ourselves to the thread
                 await hf.repost_rai_modlog(report_thread)
@@ -563,6 +605,7 @@ class Modbot(commands.Cog):
             await self.notify_end_thread(meta_channel, author.dm_channel, True)
             raise
 
+    @tracing.traced()
     async def start_report_room(self, author: discord.User, guild: discord.Guild,
                                 msg: Optional[discord.Message],
                                 report_room_type: str):
@@ -587,6 +630,7 @@ class Modbot(commands.Cog):
         except hf.EndEarly:
             return
 
+        @tracing.traced()
         async def open_room():
             if not author.dm_channel:
                 await author.create_dm()
@@ -594,12 +638,14 @@ class Modbot(commands.Cog):
                 await _safe_typing(report_channel)
 
             await _safe_typing(author.dm_channel)
-            await asyncio.sleep(1)
+            with tracing.span("typing_pause", category="pause"):
+                await asyncio.sleep(1)
 
             try:
                 voice = (report_room_type == 'voice')  # True if report_room_type == 'voice'
                 report_thread = await hf.create_report_thread(author, msg.content, report_channel,
                                                               ban_appeal=False, voice_report=voice)
+                tracing.set_trace_attributes(report_id=report_thread.id)
 
                 # try to capture the modlog that rai will post, delete it, and repost it ourselves to the thread
                 await hf.repost_rai_modlog(report_thread)
@@ -692,6 +738,7 @@ class Modbot(commands.Cog):
             await self.end_report(open_report, False)
 
         else:
+            RELAYED_MESSAGES.inc(direction=relay_direction(open_report))
             await hf.try_add_reaction(msg, "📨")
 
     async def process_msg_content(self, msg, open_report):
@@ -793,7 +840,10 @@ class Modbot(commands.Cog):
     # for when the room is to be closed and the database reset
     # the error argument tells whether the room is being closed normally or after an error
     # source is the DM channel, dest is the report room
+    @tracing.traced(starts_trace=True)
     async def end_report(self, open_report: OpenReport, error, finish=False):
+        tracing.set_trace_attributes(report_id=open_report.thread_info['thread_id'],
+                                     guild_id=open_report.thread_info['guild_id'])
         await self.notify_end_thread(open_report.source, open_report.dest, error)
 
         # get thread from open_report object
@@ -819,50 +869,103 @@ class Modbot(commands.Cog):
 
     @commands.Cog.listener()
     async def on_thread_update(self, before: discord.Thread, after: discord.Thread):
+        if before.archived or not after.archived:
+            return
+
+        if after.guild.id not in self.bot.db['guilds']:
+            return
+
+        # only report threads matter, so skip unrelated threads (like Discord's own auto-archives) before
+        # spending any requests on the audit log
+        thread_id_to_thread_info = get_thread_id_to_thread_info(self.bot.db)
+        if after.id not in thread_id_to_thread_info and not hf.is_thread_in_a_report_channel(after):
+            return
+
         # check if bot has view_audit_logs permission
         if not before.guild.me.guild_permissions.view_audit_log:
             return
 
-        if not before.archived and after.archived:
-            # check audit log to see who archived the thread
-            async for entry in after.guild.audit_logs(limit=5, action=discord.AuditLogAction.thread_update):
-                if entry.target.id == after.id:
-                    if entry.user.id == self.bot.user.id:
-                        # I archived it, so do nothing
-                        return
-
-            # thread has been archived by someone else
-            thread_id = after.id
-            thread_id_to_thread_info = get_thread_id_to_thread_info(self.bot.db)
+        # check audit log to see who archived the thread
+        if await self.was_archived_by_me(after):
+            # I archived it, so do nothing
+            return
 
-            # if the thread is a report thread, close it
-            if thread_id in thread_id_to_thread_info:
-                thread_info = thread_id_to_thread_info[thread_id]
-                user = self.bot.get_user(thread_info['user_id'])
-                if user is None:
-                    try:
-                        user = await self.bot.fetch_user(thread_info['user_id'])
-                    except (discord.NotFound, discord.HTTPException, discord.Forbidden):
-                        user = None
-
-                if user is None:
-                    await after.send("Failed to get the user who created this report.")
-                    del self.bot.db['reports'][thread_info["user_id"]]
-                    await hf.dump_json()
-                    return
+        # thread has been archived by someone else
+        thread_id = after.id
 
-                source = user.dm_channel
-                if source is None:
-                    try:
-                        source = await user.create_dm()
-                    except (discord.NotFound, discord.HTTPException, discord.Forbidden):
-                        source = after
+        # if the thread is a report thread, close it
+        if thread_id in thread_id_to_thread_info:
+            thread_info = thread_id_to_thread_info[thread_id]
+            user = self.bot.get_user(thread_info['user_id'])
+            if user is None:
+                try:
+                    user = await self.bot.fetch_user(thread_info['user_id'])
+                except (discord.NotFound, discord.HTTPException, discord.Forbidden):
+                    user = None
 
-                await self.end_report(OpenReport(thread_info, user, after, source, after), True)
+            if user is None:
+                await after.send("Failed to get the user who created this report.")
+                del self.bot.db['reports'][thread_info["user_id"]]
+                await hf.dump_json()
+                return
 
-            # else, if the thread at least is in the report room, but not an active thread, still close it
-            elif hf.is_thread_in_a_report_channel(after):
-                await hf.close_thread(after, finish=True)
+            source = user.dm_channel
+            if source is None:
+                try:
+                    source = await user.create_dm()
+                except (discord.NotFound, discord.HTTPException, discord.Forbidden):
+                    source = after
+
+            await self.end_report(OpenReport(thread_info, user, after, source, after), True)
+
+        # else, if the thread at least is in the report room, but not an active thread, still close it
+        elif hf.is_thread_in_a_report_channel(after):
+            await hf.close_thread(after, finish=True)
+
+    async def was_archived_by_me(self, thread: discord.Thread) -> bool:
+        """Checks the audit log to see if I was the one who archived a thread.
+
+        Archive events that arrive close together in the same guild are batched into a single audit log
+        request instead of each making their own."""
+        batch = self.audit_log_batches.get(thread.guild.id)
+        if batch is None:
+            batch = AuditLogBatch(future=asyncio.get_running_loop().create_future())
+            self.audit_log_batches[thread.guild.id] = batch
+            task = asyncio.create_task(self._fetch_audit_log_batch(thread.guild, batch))
+            self.audit_log_tasks.add(task)
+            task.add_done_callback(functools.partial(self._audit_log_batch_done, batch))
+        batch.thread_ids.add(thread.id)
+
+        archived_by_me = await asyncio.shield(batch.future)
+        return thread.id in archived_by_me
+
+    def _audit_log_batch_done(self, batch: AuditLogBatch, task: asyncio.Task):
+        self.audit_log_tasks.discard(task)
+        # if the lookup died before answering, pass that on rather than leaving the archive events waiting
+        if task.cancelled():
+            batch.future.cancel()
+        elif task.exception():
+            logger.error("Audit log lookup failed", exc_info=task.exception())
+            if not batch.future.done():
+                batch.future.set_exception(task.exception())
+
+    @api_usage.for_feature("audit_log")
+    async def _fetch_audit_log_batch(self, guild: discord.Guild, batch: AuditLogBatch):
+        # give other archive events in the guild a moment to join this batch, it also gives Discord time
+        # to actually write the audit log entries
+        await asyncio.sleep(AUDIT_LOG_BATCH_DELAY)
+        self.audit_log_batches.pop(guild.id, None)  # archive events from here on start a new batch
+
+        archived_by_me = set()
+        limit = min(100, 5 * len(batch.thread_ids))
+        try:
+            async for entry in guild.audit_logs(limit=limit, action=discord.AuditLogAction.thread_update):
+                if entry.user and entry.user.id == self.bot.user.id:
+                    archived_by_me.add(entry.target.id)
+        except Exception as e:
+            batch.future.set_exception(e)
+        else:
+            batch.future.set_result(archived_by_me)
 
     #
     # ############ OTHER GENERAL COMMANDS #################
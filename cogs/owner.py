@@ -4,6 +4,7 @@ import io
 import traceback
 import textwrap
 import sys
+import tracemalloc
 from contextlib import redirect_stdout
 from subprocess import PIPE, run, TimeoutExpired
 from typing import Optional
@@ -12,6 +13,8 @@ import discord
 from discord.ext import commands
 
 from .utils import helper_functions as hf
+from .utils import api_usage, memory, metrics, tracing
+from .utils.broadcast import BroadcastResult, broadcast, resume_broadcast
 from cogs.utils.BotUtils import bot_utils as utils
 
 RYRY_ID = 202995638860906496
@@ -25,6 +28,8 @@ MAIN_RYRY_TEST_BOT_ID = 536170400871219222
 SP_SERV_ID = 243838819743432704
 RY_TEST_SERV_ID = 275146036178059265
 
+FORUM_MIGRATION_CONCURRENCY = 3  # threads being moved at once by change_to_forum (each move is ~5 API calls)
+
 
 class Owner(commands.Cog):
     def __init__(self, bot):
@@ -58,18 +63,137 @@ class Owner(commands.Cog):
         else:
             await ctx.send(t)
 
+    @commands.command()
+    async def metrics(self, ctx):
+        """Sends the current metrics (the same text the METRICS_PORT endpoint serves)"""
+        buffer = io.BytesIO(bytes(metrics.REGISTRY.render(), "utf-8"))
+        await ctx.send(file=discord.File(buffer, filename="metrics.txt"))
+
+    @commands.command()
+    async def loopreport(self, ctx):
+        """Shows the event loop lag and slow callbacks since the last hourly report"""
+        await ctx.send(self.bot.loop_monitor.summary())
+
+    @commands.command()
+    async def apiusage(self, ctx):
+        """Shows the Discord API calls made per feature and route, with 429s and budget throttling"""
+        await self.send_code_block(ctx, self.bot.api_usage.report(), "api_usage.txt")
+
+    @staticmethod
+    async def send_code_block(ctx, text: str, filename: str):
+        """Sends text in a code block, or as a file if it's too long for one message"""
+        if len(text) > 1994:
+            buffer = io.BytesIO(bytes(text, "utf-8"))
+            await ctx.send(file=discord.File(buffer, filename=filename))
+        else:
+            await ctx.send(f"```{text}```")
+
+    @commands.command()
+    async def memsizes(self, ctx):
+        """Shows the approximate size of each bot.db section and of the bot's caches"""
+        rss = memory.process_rss()
+        text = f"Process RSS: {memory.format_bytes(rss) if rss else 'unknown'}\n\nbot.db sections:\n"
+        # measured on the event loop, not in a thread: the bot keeps changing these dicts, and walking one while
+        # it changes size raises RuntimeError. This blocks the bot for a moment, fine for an owner command.
+        for section, entries, size in memory.db_section_sizes(self.bot.db):
+            text += f"{memory.format_bytes(size):>11} {entries:9,d}  {section}\n"
+
+        caches = {
+            "recently_in_report_room": getattr(self.bot, "recently_in_report_room", {}),
+            "locale_store": self.bot.locale_store.locales,
+            "recent_reports_snippets": hf.here.recent_reports_snippets,
+            "pending trace spans": tracing.pending_spans,
+            "metrics": metrics.REGISTRY.metrics,
+        }
+        if unbans := self.bot.get_cog("Unbans"):
+            caches["ban cache"] = unbans.ban_cache.bans
+            caches["appeal channels"] = unbans.appeal_channels or {}
+        if events := self.bot.get_cog("Events"):
+            caches["guild roles"] = events.guild_roles or {}
+        if modbot := self.bot.get_cog("Modbot"):
+            caches["audit log batches"] = modbot.audit_log_batches
+        text += "\nBot caches:\n"
+        for name, cache in caches.items():
+            size = memory.deep_getsizeof(cache)
+            text += f"{memory.format_bytes(size):>11} {len(cache):9,d}  {name}\n"
+
+        text += "\ndiscord.py caches (counts):\n"
+        for name, count in memory.discord_cache_counts(self.bot):
+            text += f"{count:21,d}  {name}\n"
+        await self.send_code_block(ctx, text, "memory.txt")
+
+    @commands.command()
+    async def memsnapshot(self, ctx):
+        """Takes a tracemalloc snapshot and shows the top allocation sites. The first use starts tracemalloc,
+        which only sees allocations from then on and slows the bot down a little until `memstop`."""
+        if not hasattr(self.bot, "memory_snapshots"):
+            self.bot.memory_snapshots = []
+        if not tracemalloc.is_tracing():
+            memory.start_tracing()
+            await ctx.send("Started tracemalloc. Take another snapshot later to see what grows.")
+        snapshot = memory.take_snapshot()
+        self.bot.memory_snapshots.append(snapshot)
+        del self.bot.memory_snapshots[:-memory.MAX_SNAPSHOTS]
+        text = await asyncio.to_thread(memory.top_allocation_sites, snapshot)
+        await self.send_code_block(ctx, f"Snapshot {len(self.bot.memory_snapshots)}\n{text}", "snapshot.txt")
+
+    @commands.command()
+    async def memdiff(self, ctx, older: int = 0, newer: int = 0):
+        """Shows what grew between two snapshots of memsnapshot (numbered from 1, by default the last two)"""
+        snapshots = getattr(self.bot, "memory_snapshots", [])
+        if len(snapshots) < 2:
+            await ctx.send("Take at least two snapshots with `memsnapshot` first.")
+            return
+        older = older or len(snapshots) - 1
+        newer = newer or len(snapshots)
+        if not (1 <= older <= len(snapshots) and 1 <= newer <= len(snapshots)):
+            await ctx.send(f"There are only {len(snapshots)} snapshots.")
+            return
+        text = await asyncio.to_thread(memory.diff_snapshots, snapshots[older - 1], snapshots[newer - 1])
+        await self.send_code_block(ctx, f"Snapshot {older} -> {newer}\n{text}", "snapshot_diff.txt")
+
+    @commands.command()
+    async def memstop(self, ctx):
+        """Stops tracemalloc and drops the snapshots"""
+        tracemalloc.stop()
+        self.bot.memory_snapshots = []
+        await ctx.send("Stopped tracemalloc.")
+
     @commands.command()
     async def sendtoall(self, ctx, *, msg):
-        config = self.bot.db['guilds']
-        for guild in config:
-            report_room = self.bot.get_channel(config[guild]['channel'])
-            if report_room:
-                try:
-                    await report_room.send(msg)
-                except (discord.Forbidden, discord.HTTPException):
-                    pass
+        """Sends a message to the report channel of every configured guild"""
+        result = await broadcast(self.bot, msg, list(self.bot.db['guilds']))
+        await self.send_broadcast_report(ctx, result)
+
+    @commands.command()
+    async def resendtoall(self, ctx):
+        """Retries sending the last sendtoall message to the guilds it didn't reach"""
+        if not self.bot.db.get('broadcast'):
+            await ctx.send("There's no unfinished broadcast to resume.")
+            return
+        result = await resume_broadcast(self.bot)
+        await self.send_broadcast_report(ctx, result)
+
+    async def send_broadcast_report(self, ctx, result: BroadcastResult):
+        await hf.dump_json()  # save which guilds are still pending
+        report = result.summary()
+        for guild_id, reason in result.failed.items():
+            guild = self.bot.get_guild(guild_id)
+            report += f"\n- {guild.name if guild else guild_id}: {reason}"
+        for guild_id, reason in result.skipped.items():
+            guild = self.bot.get_guild(guild_id)
+            report += f"\n- skipped {guild.name if guild else guild_id}: {reason}"
+        if result.failed:
+            report += "\nUse `resendtoall` to retry the failed guilds."
+
+        if len(report) > 1994:
+            buffer = io.BytesIO(bytes(report, "utf-8"))
+            await ctx.send(report[:report.find("\n")], file=discord.File(buffer, filename="broadcast.txt"))
+        else:
+            await ctx.send(report)
+
         try:
-            await ctx.message.add_reaction('✅')
+            await ctx.message.add_reaction('✅' if not result.failed else '⚠️')
         except (discord.HTTPException, discord.Forbidden):
             pass
     
@@ -275,28 +399,76 @@ class Owner(commands.Cog):
         if ctx.guild.id != channel_before.guild.id != channel_after.guild.id:
             return
 
-        for user_id in self.bot.db['reports']:
-            report = self.bot.db['reports'][user_id]
-            # skip if report['guild_id'] != ctx.guild.id, and then check if report['thread_id'] is in channel_before
+        # old thread ID -> {'post_id': new post ID, 'steps': steps done after making the post} for threads
+        # already moved, so rerunning the command after a crash doesn't create the same posts again, and finishes
+        # notifying and archiving the threads it didn't get to
+        migrations = self.bot.db.setdefault('forum_migrations', {})
+        moved: dict[int, dict] = migrations.setdefault(channel_before_id, {})
+
+        # reports of moved threads already point at the new post, so they're found through the checkpoints
+        post_to_thread = {entry['post_id']: thread_id for thread_id, entry in moved.items()}
+        thread_ids = {t.id for t in channel_before.threads} | moved.keys()
+        to_move: list[tuple[dict, int]] = []  # (report, old thread ID)
+        for report in self.bot.db['reports'].values():
             if report['guild_id'] != ctx.guild.id:
                 continue
-            if report['thread_id'] not in [t.id for t in channel_before.threads]:
-                continue
-            await ctx.send(f"Moving thread {report['thread_id']} to {channel_after.mention}")
-            # open a post in the new forum channel with the same title and content as the thread
-            thread = channel_before.get_thread(report['thread_id'])
-            starter_message = await channel_before.fetch_message(report['thread_id'])
-            post = (await channel_after.create_thread(name=thread.name, content=starter_message.content)).thread
-            # update the report with the new thread id
-            report['thread_id'] = post.id
-            # post a message in the new post informing the mods that the thread has been moved with link to old thread
-            await post.send(f"Thread moved from {thread.mention} to {post.mention}.")
-            await thread.send(f"Thread moved to {post.mention}. This thread is no longer active.")
-            await ctx.send(f"Thread {report['thread_id']} moved to {channel_after.mention}")
-            # close the old thread
-            await thread.edit(archived=True)
+            thread_id = post_to_thread.get(report['thread_id'], report['thread_id'])
+            if thread_id in thread_ids:
+                to_move.append((report, thread_id))
+        semaphore = asyncio.Semaphore(FORUM_MIGRATION_CONCURRENCY)
+
+        @api_usage.for_feature("forum_migration")
+        async def move_thread(report: dict, thread_id: int):
+            async with semaphore:
+                thread = channel_before.get_thread(thread_id) or await self.bot.fetch_channel(thread_id)
+                entry = moved.get(thread_id)
+                if entry is None:
+                    await ctx.send(f"Moving thread {thread.id} to {channel_after.mention}")
+                    # open a post in the new forum channel with the same title and content as the thread
+                    starter_message = await channel_before.fetch_message(thread.id)
+                    post = (await channel_after.create_thread(name=thread.name,
+                                                              content=starter_message.content)).thread
+                    # checkpoint right away, before anything else can fail
+                    entry = moved[thread.id] = {'post_id': post.id, 'steps': []}
+                    report['thread_id'] = post.id
+                    await hf.dump_json()
+                else:
+                    # the post was made on an earlier run, pick up where that one stopped
+                    post = channel_after.get_thread(entry['post_id']) or await self.bot.fetch_channel(entry['post_id'])
+                    report['thread_id'] = post.id
+
+                # each step is recorded once it's done, so a rerun only repeats the ones that failed
+                steps = entry['steps']
+                if 'notify_post' not in steps:
+                    # post a message in the new post informing the mods that the thread has been moved with link
+                    # to old thread
+                    await post.send(f"Thread moved from {thread.mention} to {post.mention}.")
+                    steps.append('notify_post')
+                if 'notify_thread' not in steps:
+                    await thread.send(f"Thread moved to {post.mention}. This thread is no longer active.")
+                    steps.append('notify_thread')
+                if 'archive' not in steps:
+                    # close the old thread
+                    await thread.edit(archived=True)
+                    steps.append('archive')
+                await ctx.send(f"Thread {thread.id} moved to {post.mention}")
+
+        results = await asyncio.gather(*[move_thread(report, thread_id) for report, thread_id in to_move],
+                                       return_exceptions=True)
+        failed = [thread_id for (_, thread_id), result in zip(to_move, results) if isinstance(result, BaseException)]
+        if failed:
+            # leave the guild config and checkpoints alone so the command can be run again
+            await hf.dump_json()
+            await ctx.send(f"Failed to move {len(failed)} threads ({', '.join(str(i) for i in failed)}). "
+                           f"Run the command again to retry them.")
+            return
+
         # update self.bot.db['guilds']['channel'] with the new channel id
         self.bot.db['guilds'][ctx.guild.id]['channel'] = channel_after_id
+        del migrations[channel_before_id]
+        if not migrations:
+            del self.bot.db['forum_migrations']
+        await hf.dump_json()
         await ctx.send(f"Updated channel for {ctx.guild.name} to {channel_after.mention}")
 
     @commands.command()
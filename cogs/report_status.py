@@ -8,6 +8,7 @@ import discord
 from discord.ext import commands, tasks
 
 from .utils import helper_functions as hf
+from .utils import api_usage, metrics
 
 
 ROOM_TYPES = {
@@ -31,6 +32,9 @@ ROOM_TYPES = {
     },
 }
 
+COLLECT_THREAD_STATS_SECONDS = metrics.histogram("modbot_collect_thread_stats_seconds",
+                                                 "Time taken to read one report thread for the status board")
+
 
 @dataclass
 class ThreadStats:
@@ -53,6 +57,7 @@ class ReportStatus(commands.Cog):
         self.report_status_loop.cancel()
 
     @tasks.loop(minutes=1)
+    @api_usage.for_feature("status_board")
     async def report_status_loop(self):
         db_changed = await self.prune_stale_reports()
 
@@ -149,7 +154,8 @@ class ReportStatus(commands.Cog):
 
         stats_entries: list[ThreadStats] = []
         for report in sorted(active_reports, key=lambda item: item.get("thread_id", 0)):
-            entry = await self.collect_thread_stats(guild, report)
+            with COLLECT_THREAD_STATS_SECONDS.time():
+                entry = await self.collect_thread_stats(guild, report)
             if entry.thread is None or entry.user is None:
                 continue
             stats_entries.append(entry)
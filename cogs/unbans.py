@@ -1,5 +1,8 @@
+import asyncio
 import os
 from collections.abc import Callable, Awaitable
+from datetime import timedelta
+from typing import Optional, Union
 
 import discord
 from discord.ext import commands
@@ -16,6 +19,10 @@ MFA_URL_FR = "https://support.discord.com/hc/fr/articles/219576828"
 MFA_URL_JA = "https://support.discord.com/hc/ja/articles/219576828"
 DEAUTHORIZE_APPS_URL = "https://www.iorad.com/player/2100432/Discord---How-to-deauthorize-an-app-"
 INTERACTION_TIMEOUT_SECONDS = 300
+BAN_LOOKUP_CONCURRENCY = 10  # max fetch_ban requests in flight at once
+APPEAL_BUTTON_CUSTOM_IDS = {'main_start_button': "modbot:main_start_button",
+                            'start_appeal_button': "modbot:start_appeal_button"}
+BUTTON_CLEANUP_HISTORY_LIMIT = 50  # messages to search for old buttons if none is recorded for a channel
 
 
 async def reinitialize_buttons(unbans):
@@ -30,17 +37,66 @@ async def reinitialize_buttons(unbans):
     # 'report_button': {554572239836545074: 1233599933563666462, 774660366620950538: 1233601399024124026},
     # 'main_start_button': {985967093411368981: 1233600929740230667}
     # }
+    # The views themselves are registered in cog_load(), this only edits old messages without fixed custom_ids
     await unbans.bot.wait_until_ready()
-    for button_name, button_dict in unbans.bot.db.get('buttons', {}).items():
-        if button_name == 'start_appeal_button':
-            for channel_id, msg_id in button_dict.items():
-                print(f"Setting up appeal button view for {channel_id}, {msg_id}")
-                await unbans.setup_appeal_button_view(channel_id, msg_id)
-        
-        elif button_name == 'main_start_button':
-            for channel_id, msg_id in button_dict.items():
-                print(f"Setting up main start button view for {channel_id}, {msg_id}")
-                await unbans.setup_appeal_button_view(channel_id, msg_id)
+    await hf.reconcile_button_messages(['start_appeal_button', 'main_start_button'],
+                                       unbans.setup_appeal_button_view)
+
+
+class BanCache:
+    """Remembers whether users are banned in each guild so button clicks don't each need a fetch_ban() call.
+
+    Entries are added lazily by Unbans.is_banned() and kept current by the on_member_ban/on_member_unban events."""
+    def __init__(self):
+        self.bans: dict[int, dict[int, bool]] = {}  # guild_id -> {user_id: is_banned}
+        self.warmed_guilds: set[int] = set()  # guilds whose full ban list has been loaded
+        self.warming: dict[int, dict[int, bool]] = {}  # guild_id -> ban events received while its list loads
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, guild_id: int, user_id: int) -> Optional[bool]:
+        """Returns True/False if the ban status is known, or None if it needs to be fetched"""
+        guild_bans = self.bans.get(guild_id, {})
+        if user_id in guild_bans:
+            self.hits += 1
+            return guild_bans[user_id]
+        if guild_id in self.warmed_guilds:
+            # the full ban list is loaded, so anyone not in it is not banned
+            self.hits += 1
+            return False
+        self.misses += 1
+        return None
+
+    def set(self, guild_id: int, user_id: int, banned: bool):
+        self.bans.setdefault(guild_id, {})[user_id] = banned
+
+    def update(self, guild_id: int, user_id: int, banned: bool):
+        """Records a ban or unban event. Only guilds already in the cache (or being loaded) are updated, the ban
+        status in other guilds is never looked up, so it isn't worth keeping."""
+        if guild_id in self.warming:
+            self.warming[guild_id][user_id] = banned
+        if guild_id in self.bans:
+            self.bans[guild_id][user_id] = banned
+
+    def clear(self):
+        self.bans.clear()
+        self.warmed_guilds.clear()
+        self.warming.clear()
+
+    async def warm(self, guild: discord.Guild):
+        """Loads the full ban list of a guild (bans() paginates through it 1000 entries per request)"""
+        self.warming.setdefault(guild.id, {})
+        try:
+            guild_bans = {}
+            async for ban_entry in guild.bans(limit=None):
+                guild_bans[ban_entry.user.id] = True
+        finally:
+            events = self.warming.pop(guild.id, {})
+        # bans and unbans that happened while the pages were being fetched are newer than the list
+        guild_bans.update(events)
+        self.bans[guild.id] = guild_bans
+        self.warmed_guilds.add(guild.id)
+
 
 class BanAppealForm(utils.RaiModal, title="Ban Appeal Form"):
     appeal_text_input = discord.ui.TextInput(
@@ -83,6 +139,9 @@ class Unbans(commands.Cog):
     def __init__(self, bot):
         self.bot: commands.Bot = bot
         self.ban_appeal_server_id = int(os.getenv("BAN_APPEALS_GUILD_ID") or 0)
+        self.appeal_channels: Optional[dict[int, discord.TextChannel]] = None  # guild_id -> appeal channel
+        self.ban_cache = BanCache()
+        self.ban_lookup_semaphore = asyncio.Semaphore(BAN_LOOKUP_CONCURRENCY)
 
     @staticmethod
     def normalize_locale(locale: str) -> str:
@@ -103,6 +162,9 @@ class Unbans(commands.Cog):
         return MFA_URL_EN
     
     async def cog_load(self):
+        # persistent views are matched to button presses by custom_id, so no messages need to be fetched here
+        self.bot.add_view(self.build_appeal_button_view('main_start_button'))
+        self.bot.add_view(self.build_appeal_button_view('start_appeal_button'))
         utils.asyncio_task(reinitialize_buttons, self)
     
     @commands.Cog.listener()
@@ -115,10 +177,24 @@ class Unbans(commands.Cog):
             if msg.channel.category.id == 985967149602439198 or msg.channel.id == 985967093411368981:
                 await self.reattach_report_button(msg)  # if a mod edits one of the report info channels
 
+    def build_appeal_button_view(self, button_name: str) -> utils.RaiView:
+        """Builds the persistent view for either the 'main_start_button' or the 'start_appeal_button'"""
+        view = utils.RaiView(timeout=None)
+        button = discord.ui.Button(style=discord.ButtonStyle.primary, label="Start ban appeal",
+                                   custom_id=APPEAL_BUTTON_CUSTOM_IDS[button_name])
+        if button_name == 'main_start_button':
+            button.callback = self.main_start_button_callback
+        else:
+            button.callback = self.start_appeal_button_callback
+        view.add_item(button)
+        return view
+
     async def setup_appeal_button_view(self,
-                                       msg_channel_id: int, msg_id: int = None) -> discord.Message:
+                                       msg_channel_id: int, msg_id: int = None) -> Optional[discord.Message]:
         """Sets up the view for the ban appeal button"""
         channel = self.bot.get_channel(msg_channel_id)
+        if not channel:
+            return None
         if msg_id:
             try:
                 msg = await channel.fetch_message(msg_id)
@@ -126,113 +202,239 @@ class Unbans(commands.Cog):
                 msg = None
         else:
             msg = None
-        
-        view = utils.RaiView(timeout=0)
-        button = discord.ui.Button(style=discord.ButtonStyle.primary, label="Start ban appeal")
-        view.add_item(button)
+
+        # main appeal start button
         if channel.name == 'start_here':
-            button.callback = self.main_start_button_callback
-        elif channel.category.name == 'servers':
-            button.callback = self.start_appeal_button_callback
-        
+            button_name = 'main_start_button'
+        # the appeal start buttons in each server's appeal channel
+        elif channel.category and channel.category.name == 'servers':
+            button_name = 'start_appeal_button'
+        else:
+            return None
+        view = self.build_appeal_button_view(button_name)
+
         if msg and msg.author == self.bot.user:
             sent_msg = await msg.edit(view=view)
         else:
             invisible_character = "⁣"
             sent_msg = await channel.send(invisible_character, view=view)
-            
-            # main appeal start button
-            if channel.name == 'start_here':
-                self.bot.db['buttons'].setdefault('main_start_button', {})
-                self.bot.db['buttons']['main_start_button'][channel.id] = sent_msg.id
-            
-            # the appeal start buttons in each server's appeal channel
-            elif channel.category.name == 'servers':
-                self.bot.db['buttons'].setdefault('start_appeal_button', {})
-                self.bot.db['buttons']["start_appeal_button"][channel.id] = sent_msg.id
-        
+            self.bot.db['buttons'].setdefault(button_name, {})
+            self.bot.db['buttons'][button_name][channel.id] = sent_msg.id
+
+        hf.mark_button_persistent(sent_msg.id)
         return sent_msg
-    
+
     async def reattach_report_button(self, msg: discord.Message):
         """Called if a mod sends a message in the report info channel.
 
-        This function will clear all the UI views in the channel and reattach them to the last message in channel"""
-        async for m in msg.channel.history(limit=None):
-            if m.author == msg.guild.me:
+        This function will delete the old button message in the channel and send a new one below the mod's message"""
+        button_name = 'main_start_button' if msg.channel.name == 'start_here' else 'start_appeal_button'
+        old_button_msg_id = self.bot.db['buttons'].get(button_name, {}).get(msg.channel.id)
+        if old_button_msg_id:
+            # only the known button message needs to go, no need to look through the channel history
+            try:
+                await msg.channel.get_partial_message(old_button_msg_id).delete()
+            except (discord.NotFound, discord.Forbidden, discord.HTTPException):
+                pass
+        else:
+            # no button recorded for this channel, so clean up any of my recent messages instead
+            old_bot_msgs = [m async for m in msg.channel.history(limit=BUTTON_CLEANUP_HISTORY_LIMIT)
+                            if m.author == msg.guild.me]
+            await self.delete_bot_messages(msg.channel, old_bot_msgs)
+
+        # the mod's message can't hold my button, so don't bother fetching it, just send a new button message
+        await self.setup_appeal_button_view(msg.channel.id)
+
+    @staticmethod
+    async def delete_bot_messages(channel: discord.TextChannel, messages: list[discord.Message]):
+        """Bulk deletes messages if I can (needs Manage Messages, messages under two weeks old), otherwise deletes
+        them one by one"""
+        if not messages:
+            return
+        two_weeks_ago = discord.utils.utcnow() - timedelta(days=14)
+        if channel.permissions_for(channel.guild.me).manage_messages:
+            recent = [m for m in messages if m.created_at > two_weeks_ago]
+            for i in range(0, len(recent), 100):
+                try:
+                    await channel.delete_messages(recent[i:i + 100])
+                except (discord.NotFound, discord.HTTPException):
+                    pass
+            messages = [m for m in messages if m.created_at <= two_weeks_ago]
+
+        for m in messages:
+            try:
                 await m.delete()
-        
-        await self.setup_appeal_button_view(msg.channel.id, msg.id)
+            except (discord.NotFound, discord.Forbidden, discord.HTTPException):
+                pass
     
+    @staticmethod
+    def topic_guild_id(channel: discord.abc.GuildChannel) -> Optional[int]:
+        """The appeal channels have the ID of their guild as the first line of their topic"""
+        topic = getattr(channel, 'topic', None)
+        if not topic:
+            return None
+        try:
+            return int(topic.split('\n')[0])
+        except ValueError:
+            return None
+
+    def build_appeal_channel_map(self) -> dict[int, discord.TextChannel]:
+        """Builds a map of guild ID -> appeal channel in the ban appeals server"""
+        appeal_channels = {}
+        ban_appeal_server = self.bot.get_guild(self.ban_appeal_server_id)
+        if not ban_appeal_server:
+            return appeal_channels
+        for channel in ban_appeal_server.text_channels:
+            guild_id = self.topic_guild_id(channel)
+            if guild_id and guild_id not in appeal_channels:
+                appeal_channels[guild_id] = channel
+        self.appeal_channels = appeal_channels
+        return appeal_channels
+
+    def get_appeal_channels(self) -> dict[int, discord.TextChannel]:
+        if self.appeal_channels is None:
+            return self.build_appeal_channel_map()
+        return self.appeal_channels
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        if channel.guild.id == self.ban_appeal_server_id:
+            self.appeal_channels = None  # rebuilt on next use
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        if channel.guild.id == self.ban_appeal_server_id:
+            self.appeal_channels = None
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        if after.guild.id == self.ban_appeal_server_id:
+            if getattr(before, 'topic', None) != getattr(after, 'topic', None):
+                self.appeal_channels = None
+
+    @commands.Cog.listener()
+    async def on_member_ban(self, guild: discord.Guild, user: Union[discord.User, discord.Member]):
+        self.ban_cache.update(guild.id, user.id, True)
+
+    @commands.Cog.listener()
+    async def on_member_unban(self, guild: discord.Guild, user: discord.User):
+        self.ban_cache.update(guild.id, user.id, False)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # ban events may have been missed while disconnected, so start over
+        self.ban_cache.clear()
+
+    async def is_banned(self, guild: discord.Guild, user: discord.abc.User) -> bool:
+        """Checks if a user is banned in a guild, using the ban cache when possible.
+
+        Raises discord.Forbidden if the bot can't check bans in the guild."""
+        banned = self.ban_cache.get(guild.id, user.id)
+        if banned is not None:
+            return banned
+
+        async with self.ban_lookup_semaphore:
+            try:
+                await guild.fetch_ban(user)
+            except discord.NotFound:
+                banned = False
+            else:
+                banned = True
+        self.ban_cache.set(guild.id, user.id, banned)
+        return banned
+
+    @commands.command()
+    @commands.is_owner()
+    async def bancache(self, ctx: commands.Context, mode: str = ""):
+        """Shows the ban cache stats. Type `_bancache warm` to first load the full ban lists of every guild
+        with an appeal channel."""
+        if mode.casefold() == "warm":
+            appeal_channels = self.get_appeal_channels()
+            guilds = [guild for guild in self.bot.guilds if guild.id in appeal_channels]
+            results = await asyncio.gather(*[self.ban_cache.warm(guild) for guild in guilds],
+                                           return_exceptions=True)
+            failed = [guild.name for guild, result in zip(guilds, results) if isinstance(result, BaseException)]
+            if failed:
+                await ctx.send(f"Couldn't load the bans of: {', '.join(failed)}")
+
+        cache = self.ban_cache
+        await ctx.send(f"Ban cache: `{cache.hits}` hits, `{cache.misses}` misses, "
+                       f"`{sum(len(bans) for bans in cache.bans.values())}` entries in `{len(cache.bans)}` guilds "
+                       f"(`{len(cache.warmed_guilds)}` fully loaded)")
+
     async def main_start_button_callback(self, button_interaction: discord.Interaction):
         """Perform the following steps
         1) Checks if the user is banned in some server
         2) For each server with a ban entry for the user, it will give them the role
         with a name equal to that server's ID"""
+        # checking many guilds can take longer than the three seconds Discord gives to respond to an interaction
+        await button_interaction.response.defer(ephemeral=True, thinking=True)
+
+        appeal_channels = self.get_appeal_channels()
+        guilds = [guild for guild in self.bot.guilds if guild.id in appeal_channels]
+
+        async def check_guild(guild: discord.Guild) -> bool:
+            if button_interaction.user.id == RYRY_ID and guild.id == TEST_SERVER_ID:
+                return True
+            return await self.is_banned(guild, button_interaction.user)
+
+        results = await asyncio.gather(*[check_guild(guild) for guild in guilds], return_exceptions=True)
+
         roles = []
-        for guild in self.bot.guilds:
-            # Check if there's a channel in the appeals server corresponding to guild
-            channel = discord.utils.find(lambda c: c.topic.split('\n')[0] == str(guild.id) if c.topic else False,
-                                         button_interaction.guild.text_channels)
-            if not channel:
+        for guild, result in zip(guilds, results):
+            channel = appeal_channels[guild.id]
+            if isinstance(result, discord.Forbidden):
+                await button_interaction.followup.send(f"I lack the permission to check bans on {guild.name}. "
+                                                       f"In order to check this, I need `Ban Members`.",
+                                                       ephemeral=True)
                 continue
-            
-            # Check if user is banned in guild
-            try:
-                if button_interaction.user.id == RYRY_ID and guild.id == TEST_SERVER_ID:
-                    pass
-                else:
-                    await guild.fetch_ban(button_interaction.user)
-            except discord.NotFound:
-                pass
-            except discord.Forbidden:
-                await button_interaction.response.send_message(f"I lack the permission to check bans on {guild.name}. "
-                                                               f"In order to check this, I need `Ban Members`.")
+            elif isinstance(result, BaseException):
+                raise result
+            elif not result:
                 continue
-            
+
             # If banned, create/add the role corresponding to guild
-            else:
-                try:
-                    role = discord.utils.find(lambda r: r.name.startswith(str(guild.id)),
-                                              button_interaction.guild.roles)
-                    if not role:
-                        role = await button_interaction.guild.create_role(name=str(guild.id))
-                        try:
-                            await channel.set_permissions(role, read_messages=True)
-                        except discord.Forbidden:
-                            await button_interaction.response.send_message("I lack the ability to edit permissions "
-                                                                           "on channels. Please give me the "
-                                                                           "`Manage Channels` permission.")
-                            return
-                    await button_interaction.user.add_roles(role)
-                    roles.append(role)
-                except discord.Forbidden:
-                    await button_interaction.response.send_message("I lack the permission to manage roles in this "
-                                                                   "server. Please give me that permission.")
-                    return
-        
+            try:
+                role = discord.utils.find(lambda r: r.name.startswith(str(guild.id)),
+                                          button_interaction.guild.roles)
+                if not role:
+                    role = await button_interaction.guild.create_role(name=str(guild.id))
+                    try:
+                        await channel.set_permissions(role, read_messages=True)
+                    except discord.Forbidden:
+                        await button_interaction.followup.send("I lack the ability to edit permissions "
+                                                               "on channels. Please give me the "
+                                                               "`Manage Channels` permission.")
+                        return
+                await button_interaction.user.add_roles(role)
+                roles.append(role)
+            except discord.Forbidden:
+                await button_interaction.followup.send("I lack the permission to manage roles in this "
+                                                       "server. Please give me that permission.")
+                return
+
         found_channels = []
         if roles:
             guild_ids = [r.name.split('_')[0] for r in roles]
             for guild_id in guild_ids:
-                if found_channel := discord.utils.find(lambda c: c.topic.split('\n')[0] == str(guild_id) if c.topic else False,
-                                                       button_interaction.guild.text_channels):
+                if found_channel := appeal_channels.get(int(guild_id)):
                     found_channels.append(found_channel)
-        
+
         if button_interaction.user.id == RYRY_ID:
             found_channels.append(self.bot.get_channel(986061548877410354))
-        
+
         if found_channels:
             list_of_channel_mentions = '\n- '.join([c.mention for c in found_channels])
-            await button_interaction.response.send_message(f"I've found ban entries in at least one server. Please "
-                                                           f"check the following channels to start a ban appeal.\n"
-                                                           f"- {list_of_channel_mentions}", ephemeral=True)
+            await button_interaction.followup.send(f"I've found ban entries in at least one server. Please "
+                                                   f"check the following channels to start a ban appeal.\n"
+                                                   f"- {list_of_channel_mentions}", ephemeral=True)
         else:
             m = "You are not banned in any of the servers I currently serve on this ban appeals server. " \
                 "Please check again with the mods of that server. \n\nNote if you're sure you can't join that sever, " \
                 "you may be IP banned. If you've ever used any other Discord accounts before, please try to join " \
                 "this server with one of those accounts and try starting the process again."
-            await button_interaction.response.send_message(m, ephemeral=True)
-    
+            await button_interaction.followup.send(m, ephemeral=True)
+
     async def start_appeal_button_callback(self, button_interaction: discord.Interaction):
         """When this button is pressed, it will confirm in the language of the user client if they really wish
         to open a ban appeal"""
@@ -277,9 +479,7 @@ class Unbans(commands.Cog):
             return
         
         # Check if user is not already unbanned
-        try:
-            await guild.fetch_ban(button_interaction.user)
-        except discord.NotFound:
+        if not await self.is_banned(guild, button_interaction.user):
             if not button_interaction.user.id == int(os.getenv("OWNER_ID")):
                 await button_interaction.response.send_message("You are not banned or already unbanned from this server.",
                                                                ephemeral=True)
@@ -310,7 +510,7 @@ class Unbans(commands.Cog):
             pass  # DM works
 
         # Start ban appeal process
-        self.bot.db['user_localizations'][button_interaction.user.id] = str(locale)
+        self.bot.locale_store.set(button_interaction.user.id, locale)
         locale_key = self.normalize_locale(str(locale))
         locales = {
             "en": {
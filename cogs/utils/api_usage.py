@@ -0,0 +1,155 @@
+import asyncio
+import functools
+import logging
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from cogs.utils import metrics
+
+# Soft budgets, in Discord API calls per minute. A feature over its budget has its next calls delayed (not
+# dropped), so background work can't use up the rate limits that relays and report openings need.
+# Features without a budget are only counted.
+FEATURE_BUDGETS = {
+    "status_board": 120,  # reading every open report thread each minute adds up with many open reports
+    "report_summaries": 60,
+    "button_reconcile": 60,
+    "broadcast": 120,
+    "forum_migration": 120,
+}
+
+API_CALLS = metrics.counter("modbot_api_calls_total", "Discord API requests, by calling feature and route",
+                            ("feature", "route"))
+API_RATE_LIMITED = metrics.counter("modbot_api_rate_limited_total", "Discord API requests that got a 429",
+                                   ("feature", "route"))
+API_RETRY_AFTER = metrics.counter("modbot_api_retry_after_seconds_total",
+                                  "Seconds spent waiting on the retry-after of 429s", ("feature",))
+API_THROTTLED = metrics.counter("modbot_api_throttled_seconds_total",
+                                "Seconds requests were delayed for going over their feature's budget", ("feature",))
+
+current_feature: ContextVar[Optional[str]] = ContextVar("current_feature", default=None)
+current_route: ContextVar[Optional[str]] = ContextVar("current_route", default=None)
+
+
+@contextmanager
+def feature(name: str) -> Iterator[None]:
+    """API calls made inside this block (and in tasks started from it) are counted as this feature"""
+    token = current_feature.set(name)
+    try:
+        yield
+    finally:
+        current_feature.reset(token)
+
+
+def for_feature(name: str):
+    """Decorator version of feature() for coroutine functions"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with feature(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def calling_feature() -> str:
+    """The feature set with feature(), or else the name of the running task (like "discord.py: on_message" or
+    "command: sendtoall") without the IDs some task names end with"""
+    name = current_feature.get()
+    if name:
+        return name
+    task = asyncio.current_task()
+    if not task:
+        return "unknown"
+    return re.sub(r"[-_ ]?([0-9a-f]{16,}|\d+)$", "", task.get_name())
+
+
+class TokenBucket:
+    def __init__(self, per_minute: int):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def delay(self) -> float:
+        """Takes a token and returns how long to wait before using it"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class RateLimitHandler(logging.Handler):
+    """Catches the warnings discord.py logs when a request gets a 429. They're logged from inside the request,
+    so the context variables still name the feature and route that got rate limited."""
+    def __init__(self):
+        super().__init__(logging.WARNING)
+
+    def emit(self, record: logging.LogRecord):
+        if not record.msg.startswith("We are being rate limited") or not record.args:
+            return
+        feature_name = calling_feature()
+        API_RATE_LIMITED.inc(feature=feature_name, route=current_route.get() or "unknown")
+        if "Retrying in" in record.msg:
+            API_RETRY_AFTER.inc(record.args[-1], feature=feature_name)
+
+
+class ApiUsage:
+    """Wraps bot.http.request() (which every discord.py API call goes through) to count the calls per route and
+    feature, and to hold back features that go over their budget"""
+    def __init__(self, budgets: Optional[dict[str, int]] = None):
+        self.budgets = FEATURE_BUDGETS if budgets is None else budgets
+        self.buckets = {name: TokenBucket(per_minute) for name, per_minute in self.budgets.items()}
+        self.handler = RateLimitHandler()
+        self.since = time.time()
+
+    def install(self, http):
+        original_request = http.request
+
+        @functools.wraps(original_request)
+        async def request(route, **kwargs):
+            feature_name = calling_feature()
+            API_CALLS.inc(feature=feature_name, route=route.key)
+            if bucket := self.buckets.get(feature_name):
+                if delay := bucket.delay():
+                    API_THROTTLED.inc(delay, feature=feature_name)
+                    await asyncio.sleep(delay)
+            token = current_route.set(route.key)
+            try:
+                return await original_request(route, **kwargs)
+            finally:
+                current_route.reset(token)
+
+        http.request = request
+        logging.getLogger("discord.http").addHandler(self.handler)
+
+    def report(self, top: int = 15) -> str:
+        """Text summary of the calls since startup, for the owner `apiusage` command"""
+        per_feature: dict[str, float] = {}
+        for (feature_name, _), count in API_CALLS.values.items():
+            per_feature[feature_name] = per_feature.get(feature_name, 0) + count
+        minutes = max(1.0, (time.time() - self.since) / 60)
+
+        lines = [f"API calls in the last {minutes:.0f} minutes, by feature:"]
+        for feature_name, count in sorted(per_feature.items(), key=lambda item: item[1], reverse=True)[:top]:
+            details = [f"{count / minutes:.1f}/min"]
+            if budget := self.budgets.get(feature_name):
+                details.append(f"budget {budget}/min")
+            limited = sum(value for (name, _), value in API_RATE_LIMITED.values.items() if name == feature_name)
+            if limited:
+                details.append(f"{limited:.0f} rate limited, {API_RETRY_AFTER.get(feature=feature_name):.1f}s "
+                               f"retry-after")
+            if throttled := API_THROTTLED.get(feature=feature_name):
+                details.append(f"throttled {throttled:.1f}s")
+            lines.append(f"{count:8.0f} {feature_name} ({', '.join(details)})")
+
+        lines.append("\nBusiest routes:")
+        per_route: dict[str, float] = {}
+        for (_, route), count in API_CALLS.values.items():
+            per_route[route] = per_route.get(route, 0) + count
+        for route, count in sorted(per_route.items(), key=lambda item: item[1], reverse=True)[:top]:
+            lines.append(f"{count:8.0f} {route}")
+        return "\n".join(lines)
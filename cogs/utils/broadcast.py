@@ -0,0 +1,83 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+import discord
+from discord.ext import commands
+
+from cogs.utils import api_usage
+
+BROADCAST_CONCURRENCY = 10  # max report channels being sent to at once, discord.py waits out any 429s itself
+
+
+@dataclass
+class BroadcastResult:
+    delivered: list[int] = field(default_factory=list)  # guild IDs
+    failed: dict[int, str] = field(default_factory=dict)  # guild ID -> reason, still pending for a retry
+    skipped: dict[int, str] = field(default_factory=dict)  # guild ID -> reason, not retried (no report channel)
+    elapsed: float = 0.0
+
+    def summary(self) -> str:
+        total = len(self.delivered) + len(self.failed) + len(self.skipped)
+        rate = len(self.delivered) / self.elapsed if self.elapsed else 0.0
+        return (f"Delivered to {len(self.delivered)}/{total} guilds in {self.elapsed:.1f}s "
+                f"({rate:.1f} messages/s), {len(self.failed)} failed, {len(self.skipped)} skipped")
+
+
+async def send_to_report_channel(bot: commands.Bot, guild_id: int, msg: str):
+    """Sends msg to the report channel configured for a guild. Raises LookupError if there isn't one."""
+    channel_id = bot.db['guilds'].get(guild_id, {}).get('channel')
+    report_room = bot.get_channel(channel_id) if channel_id else None
+    if not report_room:
+        raise LookupError("report channel not found")
+    await report_room.send(msg)
+
+
+async def broadcast(bot: commands.Bot, msg: str, guild_ids: list[int],
+                    concurrency: int = BROADCAST_CONCURRENCY) -> BroadcastResult:
+    """Sends msg to the report channel of every guild in guild_ids, at most `concurrency` at a time.
+
+    Progress is kept in bot.db['broadcast'] as {'message': str, 'pending': [guild IDs]}, with guilds removed
+    from 'pending' as soon as they've been sent to. Guilds without a report channel (deleted, or a guild the bot
+    left) are skipped and removed too, as retrying them can't help. If the broadcast is interrupted or some guilds
+    fail, calling resume_broadcast() later only sends to the guilds still pending."""
+    state = {'message': msg, 'pending': list(guild_ids)}
+    bot.db['broadcast'] = state
+    return await _run_broadcast(bot, state, concurrency)
+
+
+async def resume_broadcast(bot: commands.Bot, concurrency: int = BROADCAST_CONCURRENCY) -> BroadcastResult:
+    """Retries the guilds that the last broadcast didn't reach. Returns an empty result if nothing is pending."""
+    state = bot.db.get('broadcast')
+    if not state or not state['pending']:
+        return BroadcastResult()
+    return await _run_broadcast(bot, state, concurrency)
+
+
+@api_usage.for_feature("broadcast")
+async def _run_broadcast(bot: commands.Bot, state: dict, concurrency: int) -> BroadcastResult:
+    result = BroadcastResult()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(guild_id: int):
+        async with semaphore:
+            try:
+                await send_to_report_channel(bot, guild_id, state['message'])
+            except LookupError as e:
+                result.skipped[guild_id] = str(e)
+                state['pending'].remove(guild_id)
+            except discord.Forbidden:
+                result.failed[guild_id] = "missing permissions"
+            except discord.HTTPException as e:
+                result.failed[guild_id] = f"HTTP {e.status}: {e.text}"
+            else:
+                result.delivered.append(guild_id)
+                state['pending'].remove(guild_id)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[send(guild_id) for guild_id in list(state['pending'])])
+    result.elapsed = time.perf_counter() - start
+
+    if not state['pending']:
+        bot.db.pop('broadcast', None)
+    return result
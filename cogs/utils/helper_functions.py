@@ -2,32 +2,46 @@ import asyncio
 import json
 import re
 import shutil
+from collections.abc import Awaitable, Callable
 from datetime import datetime
 from textwrap import dedent
 from typing import Optional, Union
 from copy import deepcopy
 
-import aiohttp
 import discord
 import traceback
 from discord.ext import commands
 import os
 import sys
 
-from sumy.parsers.plaintext import PlaintextParser
-from sumy.nlp.tokenizers import Tokenizer
-from sumy.summarizers import lsa
-
 from cogs.utils.BotUtils import bot_utils as utils
+from cogs.utils import api_usage, metrics, tracing
+from cogs.utils.locale_store import save_locale_store_sync
+from cogs.utils.recent_reports import RecentReport, expire_recent_reports, json_default, new_report_buffer
+from cogs.utils.summarizers import Summarizer, make_summarizer
 
 here = sys.modules[__name__]
 here.bot = None
 here.loop = None
 here.dump_json_lock = None
+here.recent_reports_snippets = {}  # (guild_id, user_id) -> rendered "Recent reports" section
+
+dir_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
 SP_SERV_ID = 243838819743432704
 JP_SERV_ID = 189571157446492161
 
+SUMMARY_WORKERS = 2  # max report summaries being made at once
+# seconds before giving up on one attempt at summarizing a report, longer than the HTTP client's REQUEST_TIMEOUT
+# so a slow summarization request fails in the client first
+SUMMARY_TIMEOUT = 45
+SUMMARY_RETRIES = 3
+
+BUTTON_RECONCILE_CONCURRENCY = 5  # max button messages fetched and edited at once during startup
+
+DUMP_JSON_SECONDS = metrics.histogram("modbot_dump_json_seconds", "Time taken to save the database")
+DB_FILE_BYTES = metrics.gauge("modbot_db_file_bytes", "Size of modbot.json after the last save")
+
 FORUM_META_THREAD_NAME = "Meta Discussion"
 FORUM_DEFAULT_TAGS = {
     'Completed': '✅',
@@ -53,29 +67,118 @@ def setup(bot: commands.Bot, loop):
     if here.dump_json_lock is None:
         here.dump_json_lock = asyncio.Lock()
 
+    # kept on the bot so that reloading this file doesn't start a second set of workers
+    if not hasattr(bot, "summary_queue"):
+        bot.summary_queue = asyncio.Queue()
+        bot.summary_workers = [asyncio.create_task(summary_worker()) for _ in range(SUMMARY_WORKERS)]
+
+    metrics.gauge("modbot_active_reports", "Open reports in bot.db['reports']", ("guild_id",),
+                  func=active_reports_by_guild)
+    metrics.gauge("modbot_wait_for_waiters", "bot.wait_for() calls waiting on an event", ("event",),
+                  func=pending_waiters)
+
+
+def active_reports_by_guild() -> dict[tuple[int], int]:
+    counts = {}
+    for report in here.bot.db['reports'].values():
+        counts[(report['guild_id'],)] = counts.get((report['guild_id'],), 0) + 1
+    return counts
+
+
+def pending_waiters() -> dict[tuple[str], int]:
+    # discord.py keeps the futures of the wait_for() calls in bot._listeners, by event name
+    return {(event,): len(waiters) for event, waiters in getattr(here.bot, '_listeners', {}).items()}
+
 
 class EndEarly(Exception):
     """This exception is raised for example when the user types 'end' or 'close' in a report thread."""
     pass
 
 
+def _rotate_backups(name: str):
+    """Keeps the last three versions of {name}.json as {name}_2.json to {name}_4.json"""
+    if os.path.exists(f'{dir_path}/{name}_3.json'):
+        shutil.copy(f'{dir_path}/{name}_3.json', f'{dir_path}/{name}_4.json')
+    if os.path.exists(f'{dir_path}/{name}_2.json'):
+        shutil.copy(f'{dir_path}/{name}_2.json', f'{dir_path}/{name}_3.json')
+    if os.path.exists(f'{dir_path}/{name}.json'):
+        shutil.copy(f'{dir_path}/{name}.json', f'{dir_path}/{name}_2.json')
+
+
 def _dump_json_sync():
-    dir_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
     db_copy = deepcopy(here.bot.db)
-    if os.path.exists(f'{dir_path}/modbot_3.json'):
-        shutil.copy(f'{dir_path}/modbot_3.json', f'{dir_path}/modbot_4.json')
-    if os.path.exists(f'{dir_path}/modbot_2.json'):
-        shutil.copy(f'{dir_path}/modbot_2.json', f'{dir_path}/modbot_3.json')
-    if os.path.exists(f'{dir_path}/modbot.json'):
-        shutil.copy(f'{dir_path}/modbot.json', f'{dir_path}/modbot_2.json')
+    _rotate_backups('modbot')
     with open(f'{dir_path}/modbot_temp.json', 'w') as write_file:
-        json.dump(db_copy, write_file, indent=4)
+        json.dump(db_copy, write_file, indent=4, default=json_default)
     shutil.copy(f'{dir_path}/modbot_temp.json', f'{dir_path}/modbot.json')
+    return os.path.getsize(f'{dir_path}/modbot.json')
 
 
+@tracing.traced(category="db")
 async def dump_json():
     async with here.dump_json_lock:
-        await asyncio.to_thread(_dump_json_sync)
+        with DUMP_JSON_SECONDS.time():
+            DB_FILE_BYTES.set(await asyncio.to_thread(_dump_json_sync))
+
+        # the user locales are saved in their own file, and only if they've changed since the last save
+        locale_store = here.bot.locale_store
+        if locale_store.dirty:
+            # cleared before the write so changes made while it runs are saved next time, and set again if it fails
+            locale_data = locale_store.to_json()
+            locale_store.dirty = False
+            try:
+                await asyncio.to_thread(_save_locale_store_sync, locale_data)
+            except Exception:
+                locale_store.dirty = True
+                raise
+
+
+def _save_locale_store_sync(data: dict):
+    _rotate_backups('user_localizations')
+    save_locale_store_sync(f'{dir_path}/user_localizations.json', data)
+
+
+def mark_button_persistent(msg_id: int):
+    """Records that a button message carries a fixed custom_id, so its view is restored by bot.add_view()
+    at startup without needing to fetch and edit the message again"""
+    persistent_buttons: list[int] = here.bot.db.setdefault('persistent_buttons', [])
+    if msg_id not in persistent_buttons:
+        persistent_buttons.append(msg_id)
+
+
+@api_usage.for_feature("button_reconcile")
+async def reconcile_button_messages(button_names: list[str],
+                                    setup_button_view: Callable[[int, int], Awaitable[Optional[discord.Message]]]):
+    """Edits the button messages in bot.db['buttons'] that were sent before buttons had fixed custom_ids.
+
+    Messages are fetched and edited concurrently, at most BUTTON_RECONCILE_CONCURRENCY at a time. Once a
+    message has been edited it's marked as persistent and skipped on future startups."""
+    persistent_buttons: list[int] = here.bot.db.setdefault('persistent_buttons', [])
+    to_reconcile = [(channel_id, msg_id)
+                    for button_name in button_names
+                    for channel_id, msg_id in here.bot.db.get('buttons', {}).get(button_name, {}).items()
+                    if msg_id not in persistent_buttons]
+    if not to_reconcile:
+        return
+
+    semaphore = asyncio.Semaphore(BUTTON_RECONCILE_CONCURRENCY)
+
+    async def reconcile(channel_id: int, msg_id: int):
+        async with semaphore:
+            print(f"Reattaching button view for {channel_id=}, {msg_id=}")
+            return await setup_button_view(channel_id, msg_id)
+
+    results = await asyncio.gather(*[reconcile(channel_id, msg_id) for channel_id, msg_id in to_reconcile],
+                                   return_exceptions=True)
+    for (channel_id, msg_id), result in zip(to_reconcile, results):
+        if isinstance(result, BaseException):
+            print(f"Failed to reattach button view for {channel_id=}, {msg_id=}: {result!r}", file=sys.stderr)
+
+    # forget messages that have since been replaced
+    current_msg_ids = {msg_id for button_dict in here.bot.db.get('buttons', {}).values()
+                       for msg_id in button_dict.values()}
+    persistent_buttons[:] = [msg_id for msg_id in persistent_buttons if msg_id in current_msg_ids]
+    await dump_json()
 
 
 async def ensure_forum_meta_thread(forum_channel: discord.ForumChannel) -> Optional[discord.Thread]:
@@ -181,6 +284,7 @@ async def edit_thread_tags(thread: discord.Thread, add: list[str] = None, remove
     await thread.edit(archived=False, applied_tags=applied_tags)
 
 
+@tracing.traced("capture_rai_modlog", category="rai")
 async def _pre_repost_rai_modlog(report_thread: discord.Thread):
     """This will repost the modlog that Rai posts in the report thread."""
     modlog_placeholder = await report_thread.send(".")
@@ -188,10 +292,11 @@ async def _pre_repost_rai_modlog(report_thread: discord.Thread):
     if rai in report_thread.guild.members:
         # try to capture the modlog that will be posted by Rai, and repost it yourself
         try:
-            rai_msg = await here.bot.wait_for("message",
-                                              timeout=10.0,
-                                              check=lambda m:
-                                              m.channel == report_thread and m.author.id == rai.id and m.embeds)
+            with tracing.span("wait_for_rai_modlog", category="rai"):
+                rai_msg = await here.bot.wait_for("message",
+                                                  timeout=10.0,
+                                                  check=lambda m:
+                                                  m.channel == report_thread and m.author.id == rai.id and m.embeds)
         except asyncio.TimeoutError:
             await modlog_placeholder.delete()
         else:
@@ -225,6 +330,7 @@ async def try_add_reaction(msg, emoji):
         pass
 
 
+@tracing.traced()
 async def deliver_ban_appeal_msg_to_thread(report_thread: discord.Thread, 
                                            author: discord.User,
                                            appeal_text: str):
@@ -242,6 +348,7 @@ async def forward_ban_appeal_msg_to_dm(dm_channel: discord.DMChannel, appeal_tex
         await dm_channel.send(f"{section_prefix}{section}")
 
 
+@tracing.traced()
 async def deliver_first_report_msg_to_thread(
         report_thread: discord.Thread,
         author: discord.User,
@@ -264,6 +371,7 @@ async def deliver_first_report_msg_to_thread(
         await report_thread.send(embed=msg.embeds[0])
 
 
+@tracing.traced()
 async def notify_user_of_ban_appeal_connection(author: discord.User):
     locale: str = get_user_locale(author.id)
     appeal_desc = {
@@ -305,6 +413,7 @@ async def notify_user_of_ban_appeal_connection(author: discord.User):
                                           color=0x00FF00))
 
 
+@tracing.traced()
 async def notify_user_of_report_connection(author: discord.User):
     locale: str = get_user_locale(author.id)
     desc = {
@@ -343,6 +452,7 @@ async def notify_user_of_report_connection(author: discord.User):
                                           color=0x00FF00))
 
 
+@tracing.traced()
 async def add_report_to_db(author: discord.User, report_thread: discord.Thread, report_room_type: str = "main"):
     here.bot.db['reports'][author.id] = {
         "user_id": author.id,
@@ -458,20 +568,54 @@ async def wait_for_further_info_from_op(report_entry_message: discord.Message,
                     await report_entry_message.edit(content=new_content)
 
 
+@tracing.traced()
 async def log_record_of_report(thread: discord.Thread, author: discord.User):
     """This will log a record of a report in the database under
-    bot.db['recent_reports'][thread.guild.id][author.id]"""
+    bot.db['recent_reports'][thread.guild.id][author.id]
+
+    The summary of the report is added later by the summary workers, so closing a report doesn't have to
+    wait on reading the thread or on the summarization API."""
     guild_id = thread.guild.id
     author_id = author.id
     recent_reports = here.bot.db.setdefault('recent_reports', {})
-    if guild_id not in recent_reports:
-        recent_reports[guild_id] = {}
-    if author_id not in recent_reports[guild_id]:
-        recent_reports[guild_id][author_id] = []
-    
-    # thread_info: {'thread_id': int, 'timestamp': int, 'summary': str}
-    thread_info = {'thread_id': thread.id, 'timestamp': int(datetime.utcnow().timestamp())}
-    
+    user_reports = recent_reports.setdefault(guild_id, {}).setdefault(author_id, new_report_buffer())
+
+    # a full buffer drops its oldest report by itself
+    user_reports.append(RecentReport(thread.id, int(datetime.utcnow().timestamp())))
+    update_recent_reports_snippet(author_id, guild_id)
+
+    here.bot.summary_queue.put_nowait((thread, author_id))
+
+
+@api_usage.for_feature("report_summaries")
+async def summary_worker():
+    """Takes reports off bot.summary_queue and fills in their summary. SUMMARY_WORKERS of these run at once."""
+    while True:
+        thread, author_id = await here.bot.summary_queue.get()
+        try:
+            for attempt in range(SUMMARY_RETRIES):
+                try:
+                    # not wait_for(): on 3.11 it can swallow a cancel() that arrives as the summary finishes,
+                    # and the worker would go back to waiting on the queue instead of stopping
+                    async with asyncio.timeout(SUMMARY_TIMEOUT):
+                        summary = await summarize_report(thread)
+                    if summary and set_recent_report_summary(thread.guild.id, author_id, thread.id, summary):
+                        update_recent_reports_snippet(author_id, thread.guild.id)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    if attempt == SUMMARY_RETRIES - 1:
+                        print(f"Failed to summarize report thread {thread.id}: {e!r}", file=sys.stderr)
+                    else:
+                        await asyncio.sleep(5 * 2 ** attempt)
+                else:
+                    break
+        finally:
+            here.bot.summary_queue.task_done()
+
+
+async def summarize_report(thread: discord.Thread) -> Optional[str]:
+    """Reads the start of a report thread and returns a summary of it, or None if there's nothing to summarize"""
     thread_text = ""
     async for m in thread.history(limit=10, oldest_first=True):
         if m.content.startswith(">>>"):
@@ -480,23 +624,60 @@ async def log_record_of_report(thread: discord.Thread, author: discord.User):
     thread_text = thread_text[:500]
     
     if not thread_text:
-        pass
+        return None
     elif len(thread_text) < 250:
-        thread_info['summary'] = thread_text.replace('\n', '. ')
+        return thread_text.replace('\n', '. ')
     else:
-        if hasattr(here.bot, "eden"):
-            if not here.bot.eden:
-                pass
-            else:
-                summary = await eden_summarize(thread_text, language="en", sentences_count=1)
-                summary = summary.replace('\n', '. ')
-                thread_info['summary'] = summary
-    
-    recent_reports[guild_id][author_id].append(thread_info)
-    if len(recent_reports[guild_id][author_id]) > 5:
-        recent_reports[guild_id][author_id].pop(0)
-        
-        
+        summarizer = get_summarizer()
+        if summarizer:
+            summary = await summarizer.summarize(thread_text, sentences_count=1)
+            return summary.replace('\n', '. ')
+        return None
+
+
+def set_recent_report_summary(guild_id: int, author_id: int, thread_id: int, summary: str) -> bool:
+    """Fills in the summary of a report in bot.db['recent_reports']. Returns False if the report isn't there
+    anymore (pushed out by newer reports or expired while it was being summarized)."""
+    user_reports = here.bot.db.get('recent_reports', {}).get(guild_id, {}).get(author_id, ())
+    for i, record in enumerate(user_reports):
+        if record.thread_id == thread_id:
+            user_reports[i] = record._replace(summary=summary)
+            return True
+    return False
+
+
+def expire_old_recent_reports():
+    """Removes old reports from bot.db['recent_reports'] and the cached sections that showed them"""
+    for guild_id, author_id in expire_recent_reports(here.bot.db.get('recent_reports', {})):
+        here.recent_reports_snippets.pop((guild_id, author_id), None)
+
+
+def render_recent_reports(author_id: int, guild_id: int) -> str:
+    """Renders the "Recent reports" section for a user in a guild, or an empty string if they have none."""
+    past_reports = here.bot.db.get('recent_reports', {}).get(guild_id, {}).get(author_id)
+    if not past_reports:
+        return ""
+
+    snippet = "\n\n**__Recent reports:__**\n"
+    for record in past_reports:
+        # add a single-line bullet point containing very shortly just the thread date and summary
+        message_link = f"<https://discord.com/channels/{guild_id}/{record.thread_id}>"
+        # format using discord time string, <t:TIMESTAMP:f>
+        snippet += f"• [<t:{record.timestamp}:f> (link)]({message_link})"
+        if record.summary:
+            snippet += f" - {record.summary}"
+        snippet += "\n"
+
+    return snippet
+
+
+def update_recent_reports_snippet(author_id: int, guild_id: int) -> str:
+    """Re-renders the cached "Recent reports" section of a user, called whenever their recent reports change"""
+    snippet = render_recent_reports(author_id, guild_id)
+    here.recent_reports_snippets[(guild_id, author_id)] = snippet
+    return snippet
+
+
 def add_recent_report_info(thread_text: str, author_id: int, guild_id: int) -> str:
     """This will add a list of recent reports from the user to the thread text.
     Params:
@@ -504,27 +685,11 @@ def add_recent_report_info(thread_text: str, author_id: int, guild_id: int) -> s
     - author_id: int: The ID of the user to get the recent reports from.
     - guild_id: int: The ID of the guild to get the recent reports from.
     Returns: str: The thread text with the recent reports added."""
-    try:
-        past_reports: list[dict] = here.bot.db['recent_reports'][guild_id][author_id]
-    except KeyError:
-        return thread_text
-    
-    if not past_reports:
-        return thread_text
-    else:
-        thread_text += "\n\n**__Recent reports:__**\n"
-    for thread_info in past_reports:
-        # thread_info: {'thread_id': int, 'timestamp': int, 'summary': str}
-        # add a single-line bullet point containing very shortly just the thread date and summary
-        message_link = f"<https://discord.com/channels/{guild_id}/{thread_info['thread_id']}>"
-        date_timestamp: int = thread_info['timestamp']
-        # format using discord time string, <t:TIMESTAMP:f>
-        thread_text += f"• [<t:{date_timestamp}:f> (link)]({message_link})"
-        if thread_info.get('summary', ''):
-            thread_text += f" - {thread_info['summary']}"
-        thread_text += "\n"
-    
-    return thread_text
+    snippet = here.recent_reports_snippets.get((guild_id, author_id))
+    if snippet is None:
+        snippet = update_recent_reports_snippet(author_id, guild_id)
+    return thread_text + snippet
+
 
 def escape_username(username: str):
     return username.replace("_", "\_")
@@ -543,8 +708,8 @@ def build_report_short_description(author: discord.User, title: str, is_staff_te
     
     return entry_text
 
-def build_report_thread_header(author: discord.User, guild_id: int):
-    thread_text = rf"""
+# the static part of the header is the same for every report, so only build it once
+REPORT_THREAD_HEADER = dedent(rf"""
             I'll relay any of their messages to this 
             channel. 
                 \- Any messages you type will be sent
@@ -560,11 +725,14 @@ def build_report_thread_header(author: discord.User, guild_id: int):
                     commands would not be sent.
                     Currently exempted bot prefixes:
                     `{'`   `'.join(EXEMPTED_BOT_PREFIXES)}`
-            """
-    thread_text = dedent(thread_text)
-    thread_text = add_recent_report_info(thread_text, author.id, guild_id)
-    return thread_text
+            """)
+
+
+def build_report_thread_header(author: discord.User, guild_id: int):
+    return add_recent_report_info(REPORT_THREAD_HEADER, author.id, guild_id)
 
+
+@tracing.traced()
 async def create_report_thread(author: discord.User, report_text: str,
                                report_channel: Union[discord.TextChannel, discord.ForumChannel],
                                ban_appeal: bool = False, voice_report: bool = False):
@@ -616,6 +784,7 @@ async def create_report_thread(author: discord.User, report_text: str,
     return report_thread
 
 
+@tracing.traced()
 async def close_thread(thread: discord.Thread, finish=False):
     """This will close a thread, and if finish is True, it will also mark it as resolved."""
     # if parent is a text channel, remove ❗ reaction from thread parent message if there
@@ -644,6 +813,7 @@ async def close_thread(thread: discord.Thread, finish=False):
         await thread.edit(archived=True)
 
 
+@tracing.traced()
 async def deny_new_user_role_request(guild: discord.Guild, author: discord.User, msg: discord.Message,
                                        meta_channel: discord.Thread):
     # #### SPECIAL STUFF FOR JP SERVER ####
@@ -688,6 +858,7 @@ async def deny_new_user_role_request(guild: discord.Guild, author: discord.User,
             raise EndEarly
 
 
+@tracing.traced()
 async def get_report_variables(guild, report_room_type, author):
     guild_config = here.bot.db['guilds'][guild.id]
     
@@ -734,6 +905,7 @@ async def get_report_variables(guild, report_room_type, author):
     return report_channel, meta_channel
 
 
+@tracing.traced()
 async def check_bot_perms(report_channel, meta_channel, guild, author):
     """Check if the bot has the permissions to send messages in the report channel and create threads."""
     perms = report_channel.permissions_for(guild.me)
@@ -781,6 +953,7 @@ async def check_if_valid_msg(msg):
     return True
 
 
+@tracing.traced()
 async def setup_confirm_guild_buttons(guild: discord.Guild, author: discord.User):
     txt = (f"Hello, you are trying to start a support ticket/report with "
            f"the mods of {guild.name}.\n\n"
@@ -842,7 +1015,7 @@ async def setup_confirm_guild_buttons(guild: discord.Guild, author: discord.User
     # delete original message if user pushes a button
     async def button_callback1(button_interaction: discord.Interaction):
         locale = button_interaction.locale
-        here.bot.db['user_localizations'][author.id] = str(locale)
+        here.bot.locale_store.set(author.id, locale)
         await q_msg.delete()
         first_msg_conf = {
             "en": "I will try to send your first message. "
@@ -863,7 +1036,7 @@ async def setup_confirm_guild_buttons(guild: discord.Guild, author: discord.User
         await button_interaction.response.send_message(conf_txt, ephemeral=True)
 
     async def button_callback2(button_interaction: discord.Interaction):
-        here.bot.db['user_localizations'][author.id] = str(button_interaction.locale)
+        here.bot.locale_store.set(author.id, button_interaction.locale)
         await q_msg.delete()
         await button_interaction.response.send_message("Canceling report",
                                                        ephemeral=True)
@@ -891,7 +1064,7 @@ async def setup_confirm_guild_buttons(guild: discord.Guild, author: discord.User
 
 def get_user_locale(user_id: int) -> str:
     """Returns the user's locale from the database, defaulting to 'en'."""
-    return here.bot.db.get('user_localizations', {}).get(user_id, 'en')[:2]
+    return here.bot.locale_store.get(user_id, 'en')
 
 
 def is_thread_in_a_report_channel(thread: discord.Thread) -> bool:
@@ -904,48 +1077,27 @@ def is_thread_in_a_report_channel(thread: discord.Thread) -> bool:
     return thread.parent.id in [report_channel, secondary_report_channel, voice_report_channel]
 
 
-def summarize(text, language="english", sentences_count=1):
-    parser = PlaintextParser.from_string(text, Tokenizer(language))
-    # luhn, edmundson, lsa, lex_rank, sum_basic, kl, reduction
-    # summarizers = [luhn.LuhnSummarizer(),
-    #                lsa.LsaSummarizer(), lex_rank.LexRankSummarizer(),
-    #                sum_basic.SumBasicSummarizer(), kl.KLSummarizer(),
-    #                reduction.ReductionSummarizer()]
-    summarizer = lsa.LsaSummarizer()
-    summary = summarizer(parser.document, sentences_count)
-
-    return summary
-
-
-async def eden_summarize(text, language="en", sentences_count=1) -> str:
-    url = "https://api.edenai.run/v2/text/summarize"
-    payload = {
-        "response_as_dict": True,
-        "attributes_as_list": False,
-        "show_original_response": False,
-        "output_sentences": sentences_count,
-        "providers": "cohere",
-        "text": text,
-        "language": language,
-    }
-    headers = {
-        "accept": "application/json",
-        "content-type": "application/json",
-        "authorization": "Bearer " + os.getenv("EDEN_KEY"),
-    }
+def get_summarizer() -> Optional[Summarizer]:
+    """Returns the summarizer engine to use for report summaries, or None if summaries are disabled.
+
+    The engine is set with SUMMARIZER in the .env file ('eden' or 'sumy'). Setting bot.eden = True also
+    selects the eden engine like before."""
+    engine_name = os.getenv("SUMMARIZER", "")
+    if not engine_name and getattr(here.bot, "eden", False):
+        engine_name = "eden"
+    if not engine_name:
+        return None
+
+    # kept on the bot so the sumy process pool and the cached results survive reloading this file
+    if not hasattr(here.bot, "summarizers"):
+        here.bot.summarizers = {}
+    if engine_name not in here.bot.summarizers:
+        summarizer = make_summarizer(engine_name, here.bot.http_client)
+        if not summarizer:
+            return None
+        here.bot.summarizers[engine_name] = summarizer
+    return here.bot.summarizers[engine_name]
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, json=payload, headers=headers) as response:
-            response = await response.json()
-            
-    if 'cohere' in response:
-        response = response['cohere']
-        if response['status'] == 'success':
-            return response['result']
-    
-    # if the response is not successful, raise an error
-    raise Exception(f"EdenAI API returned an error: {response}")
-    
 
 async def send_to_test_channel(*content, debug=True):
     if not debug:
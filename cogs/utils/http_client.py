@@ -0,0 +1,83 @@
+import asyncio
+import sys
+from typing import Any, Optional
+
+import aiohttp
+
+TOTAL_CONNECTIONS = 100  # max open connections across all hosts
+CONNECTIONS_PER_HOST = 10
+REQUEST_TIMEOUT = 30  # seconds for a whole request, including reading the response
+MAX_RETRIES = 3  # only for idempotent methods, see request_json()
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HTTPClient:
+    """One pooled aiohttp session for all the outbound HTTP requests of the bot (not the Discord API, which
+    discord.py handles itself).
+
+    It's created in Modbot.setup_hook() as bot.http_client and closed in Modbot.close(), so any cog can use
+    it, and connections (and their TLS setup) are reused between requests."""
+    def __init__(self,
+                 total_connections: int = TOTAL_CONNECTIONS,
+                 connections_per_host: int = CONNECTIONS_PER_HOST,
+                 timeout: float = REQUEST_TIMEOUT,
+                 max_retries: int = MAX_RETRIES):
+        self.total_connections = total_connections
+        self.connections_per_host = connections_per_host
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        if self.session and not self.session.closed:
+            return
+        connector = aiohttp.TCPConnector(limit=self.total_connections,
+                                         limit_per_host=self.connections_per_host,
+                                         ttl_dns_cache=300)
+        self.session = aiohttp.ClientSession(connector=connector,
+                                             timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+    async def request_json(self, method: str, url: str, max_retries: Optional[int] = None, **kwargs) -> Any:
+        """Makes a request and returns the decoded JSON response.
+
+        Connection errors, timeouts, 429s and 5xx responses are retried up to max_retries times with
+        exponential backoff (or the Retry-After header if the server sends one). Other error statuses raise
+        aiohttp.ClientResponseError right away.
+
+        max_retries defaults to the client's for idempotent methods and to 0 for others like POST, where the
+        server may have done (and billed) the work before failing. Pass it to opt a request in."""
+        if not self.session or self.session.closed:
+            await self.start()
+        if max_retries is None:
+            max_retries = self.max_retries if method.upper() in IDEMPOTENT_METHODS else 0
+
+        for attempt in range(max_retries + 1):
+            retry_after = None
+            try:
+                async with self.session.request(method, url, **kwargs) as response:
+                    if response.status in RETRY_STATUSES and attempt < max_retries:
+                        retry_after = response.headers.get("Retry-After")
+                    else:
+                        response.raise_for_status()
+                        return await response.json()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == max_retries:
+                    raise
+                print(f"HTTP {method} {url} failed ({e!r}), retrying", file=sys.stderr)
+
+            try:
+                delay = float(retry_after) if retry_after else 2 ** attempt
+            except ValueError:
+                delay = 2 ** attempt
+            await asyncio.sleep(min(delay, 60))
+
+    async def get_json(self, url: str, **kwargs) -> Any:
+        return await self.request_json("GET", url, **kwargs)
+
+    async def post_json(self, url: str, **kwargs) -> Any:
+        return await self.request_json("POST", url, **kwargs)
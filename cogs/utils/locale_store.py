@@ -0,0 +1,106 @@
+import json
+import os
+import sys
+import time
+from typing import Optional
+
+LOCALE_EXPIRY_DAYS = 180  # forget users that haven't interacted with the bot for about six months
+LAST_SEEN_RESOLUTION_DAYS = 7  # only refresh a user's "last seen" day once a week to avoid needless saves
+
+
+def today() -> int:
+    """Days since the epoch, the unit "last seen" is stored in"""
+    return int(time.time() // 86400)
+
+
+class LocaleStore:
+    """Stores the two-letter locale code of users along with the day they were last seen.
+
+    The store is saved to its own file, and only when something changed (see helper_functions.dump_json()), so
+    the interactions that happen constantly don't cause the whole database to be rewritten."""
+    def __init__(self):
+        self.locales: dict[int, tuple[str, int]] = {}  # user_id -> (locale code, last seen day)
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.locales)
+
+    def __contains__(self, user_id: int):
+        return user_id in self.locales
+
+    def get(self, user_id: int, default: str = 'en') -> str:
+        entry = self.locales.get(user_id)
+        return entry[0] if entry else default
+
+    def set(self, user_id: int, locale) -> bool:
+        """Records the locale of a user (a discord.Locale or a string like 'en-US').
+        Returns True if anything changed."""
+        code = sys.intern(str(locale)[:2])  # only a handful of distinct codes, so share the string objects
+        day = today()
+        entry = self.locales.get(user_id)
+        if entry and entry[0] == code and day - entry[1] < LAST_SEEN_RESOLUTION_DAYS:
+            return False
+
+        self.locales[user_id] = (code, day)
+        self.dirty = True
+        return True
+
+    def expire(self, max_age_days: int = LOCALE_EXPIRY_DAYS) -> int:
+        """Removes users not seen in max_age_days, returns the number of users removed"""
+        cutoff = today() - max_age_days
+        expired = [user_id for user_id, (_, last_seen) in self.locales.items() if last_seen < cutoff]
+        for user_id in expired:
+            del self.locales[user_id]
+        if expired:
+            self.dirty = True
+        return len(expired)
+
+    def to_json(self) -> dict:
+        """Compact form for saving, each distinct code is written once:
+        {"codes": ["en", "es"], "users": {"123456789": [code_index, last_seen_day]}}"""
+        codes: dict[str, int] = {}
+        users = {}
+        for user_id, (code, last_seen) in self.locales.items():
+            code_index = codes.setdefault(code, len(codes))
+            users[str(user_id)] = [code_index, last_seen]
+        return {"codes": list(codes), "users": users}
+
+    @classmethod
+    def from_json(cls, data: Optional[dict]) -> 'LocaleStore':
+        """Loads either the compact form from to_json() or the old bot.db['user_localizations'] dict of
+        {user_id: 'en-US'}"""
+        store = cls()
+        if not data:
+            return store
+
+        if "codes" in data and "users" in data:
+            codes = [sys.intern(code) for code in data["codes"]]
+            for user_id, (code_index, last_seen) in data["users"].items():
+                store.locales[int(user_id)] = (codes[code_index], last_seen)
+        else:
+            # old format without last seen days, so count everyone as seen today
+            day = today()
+            for user_id, locale in data.items():
+                store.locales[int(user_id)] = (sys.intern(str(locale)[:2]), day)
+            store.dirty = True
+
+        return store
+
+
+def load_locale_store(file_path: str, old_db_localizations: Optional[dict] = None) -> LocaleStore:
+    """Loads the locale store from its file, or from the old bot.db['user_localizations'] section if it
+    hasn't been moved to its own file yet"""
+    if os.path.exists(file_path):
+        with open(file_path, "r") as read_file:
+            store = LocaleStore.from_json(json.load(read_file))
+    else:
+        store = LocaleStore.from_json(old_db_localizations)
+    store.expire()
+    return store
+
+
+def save_locale_store_sync(file_path: str, data: dict):
+    temp_path = f"{file_path}.temp"
+    with open(temp_path, "w") as write_file:
+        json.dump(data, write_file, separators=(',', ':'))
+    os.replace(temp_path, file_path)
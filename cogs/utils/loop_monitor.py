@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+from typing import Optional
+
+from cogs.utils import metrics
+
+LOOP_LAG_INTERVAL = 0.5  # seconds between event loop lag samples
+LOOP_LAG_WARNING = 1.0  # seconds; lag this high is printed right away, it's enough to delay gateway heartbeats
+LOOP_LAG_REPORT_THRESHOLD = 0.25  # seconds; the periodic summary is only sent if the lag got this high
+SLOW_CALLBACKS_SHOWN = 8  # offenders listed in a summary
+
+bot_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+LOOP_LAG_SECONDS = metrics.histogram("modbot_event_loop_lag_seconds",
+                                     "How late a timer on the event loop fires",
+                                     buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+SLOW_CALLBACKS = metrics.counter("modbot_slow_callbacks_total",
+                                 "Callbacks that blocked the event loop longer than the slow callback threshold")
+
+
+def slow_callback_threshold() -> Optional[float]:
+    """Seconds from SLOW_CALLBACK_MS in the .env file, or None if slow callback detection is off.
+
+    Detection uses asyncio's debug mode, which also records where every task and callback was created, so it costs
+    some speed and is only turned on when asked for."""
+    ms = os.getenv("SLOW_CALLBACK_MS")
+    return int(ms) / 1000 if ms else None
+
+
+def suspended_at(coro) -> Optional[str]:
+    """The innermost line of bot code that a coroutine chain is waiting at, like "cogs/modbot.py:412 in on_message".
+    The blocking code of a slow step runs between the previous await and this one, so this is where to look."""
+    location = None
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        filename = frame.f_code.co_filename
+        if filename.startswith(bot_dir) and "site-packages" not in filename:
+            location = f"{os.path.relpath(filename, bot_dir)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return location
+
+
+def describe_handle(handle: asyncio.Handle) -> str:
+    """Names what a slow callback was running. Listener tasks are named "discord.py: on_<event>" by discord.py and
+    command tasks are renamed by name_command_task(), the location narrows it down to the cog function."""
+    callback = getattr(handle, "_callback", None)
+    task = getattr(callback, "__self__", None)
+    if isinstance(task, asyncio.Task):
+        location = suspended_at(task.get_coro())
+        if location is None:
+            # the step finished the task, so there's no frame left to look at
+            location = getattr(task.get_coro(), "__qualname__", "")
+        return f"{task.get_name()} ({location})" if location else task.get_name()
+    return getattr(callback, "__qualname__", repr(callback))
+
+
+async def name_command_task(ctx):
+    """Bot-wide before_invoke hook, so slow callbacks of commands are attributed to the command instead of to the
+    on_message listener that invoked it"""
+    task = asyncio.current_task()
+    if task:
+        task.set_name(f"command: {ctx.command.qualified_name}")
+
+
+class SlowCallbackHandler(logging.Handler):
+    """Catches the "Executing <handle> took x seconds" warnings asyncio logs in debug mode"""
+    def __init__(self, monitor: 'LoopMonitor'):
+        super().__init__(logging.WARNING)
+        self.monitor = monitor
+
+    def emit(self, record: logging.LogRecord):
+        if not record.msg.startswith("Executing ") or len(record.args) != 2:
+            return
+        try:
+            # asyncio logs this while the slow handle is still the loop's current handle
+            handle = getattr(asyncio.get_running_loop(), "_current_handle", None)
+        except RuntimeError:
+            handle = None
+        source = describe_handle(handle) if handle else str(record.args[0])
+        self.monitor.record_slow_callback(source, record.args[1])
+
+
+class LoopMonitor:
+    """Measures how late the event loop runs a timer (the lag every other task sees too), and collects the
+    callbacks that blocked the loop, until the next summary"""
+    def __init__(self):
+        self.lag_samples: list[float] = []
+        self.slow_callbacks: dict[str, list[float]] = {}  # source -> [count, total seconds, max seconds]
+        self.since = time.time()
+        self.task: Optional[asyncio.Task] = None
+        self.handler: Optional[SlowCallbackHandler] = None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self.task = loop.create_task(self._watch_lag(), name="loop lag watchdog")
+        threshold = slow_callback_threshold()
+        if threshold:
+            loop.set_debug(True)
+            loop.slow_callback_duration = threshold
+            self.handler = SlowCallbackHandler(self)
+            logging.getLogger("asyncio").addHandler(self.handler)
+            print(f"Reporting callbacks that block the event loop for over {threshold * 1000:.0f} ms")
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+        if self.handler:
+            logging.getLogger("asyncio").removeHandler(self.handler)
+
+    async def _watch_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            lag = max(0.0, loop.time() - start - LOOP_LAG_INTERVAL)
+            self.lag_samples.append(lag)
+            LOOP_LAG_SECONDS.observe(lag)
+            if lag >= LOOP_LAG_WARNING:
+                print(f"The event loop was blocked for {lag:.2f}s", file=sys.stderr)
+
+    def record_slow_callback(self, source: str, duration: float):
+        SLOW_CALLBACKS.inc()
+        entry = self.slow_callbacks.setdefault(source, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += duration
+        entry[2] = max(entry[2], duration)
+
+    def summary(self) -> str:
+        minutes = (time.time() - self.since) / 60
+        samples = sorted(self.lag_samples) or [0.0]
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        over_warning = sum(1 for lag in samples if lag >= LOOP_LAG_WARNING)
+        text = (f"**Event loop report** (last {minutes:.0f} minutes)\n"
+                f"Loop lag: p50 {samples[len(samples) // 2] * 1000:.0f} ms, p99 {p99 * 1000:.0f} ms, "
+                f"max {samples[-1] * 1000:.0f} ms, {over_warning} time(s) over {LOOP_LAG_WARNING:.0f}s\n")
+
+        if self.handler is None:
+            text += "Slow callback detection is off (set SLOW_CALLBACK_MS in .env to see what blocked the loop)"
+            return text
+        if not self.slow_callbacks:
+            return text + "No slow callbacks"
+
+        offenders = sorted(self.slow_callbacks.items(), key=lambda item: item[1][1], reverse=True)
+        lines = [f"`{count:4d}× total {total:6.2f}s max {longest:5.2f}s` {source[:150]}"
+                 for source, (count, total, longest) in offenders[:SLOW_CALLBACKS_SHOWN]]
+        if len(offenders) > SLOW_CALLBACKS_SHOWN:
+            lines.append(f"...and {len(offenders) - SLOW_CALLBACKS_SHOWN} more")
+        return text + "Slow callbacks:\n" + "\n".join(lines)
+
+    def worth_reporting(self) -> bool:
+        return bool(self.slow_callbacks) or max(self.lag_samples, default=0.0) >= LOOP_LAG_REPORT_THRESHOLD
+
+    def reset(self):
+        self.lag_samples = []
+        self.slow_callbacks = {}
+        self.since = time.time()
@@ -0,0 +1,114 @@
+import sys
+import tracemalloc
+from collections import deque
+from typing import Optional
+
+TRACEMALLOC_FRAMES = 10  # frames stored per allocation, more shows deeper call sites but costs more memory
+TOP_ALLOCATION_SITES = 15
+MAX_SNAPSHOTS = 5  # snapshots kept for memdiff, each can take as much memory as the traces it holds
+
+
+def deep_getsizeof(obj) -> int:
+    """Approximate bytes used by obj and everything it holds: containers are followed, and so is the __dict__ of
+    plain objects. Objects reachable twice (like interned strings) are only counted once."""
+    seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            stack.extend(item)
+        elif hasattr(item, "__dict__") and not isinstance(item, type):
+            stack.append(vars(item))
+    return size
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size:.0f} B"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def format_bytes_diff(size: float) -> str:
+    return format_bytes(size) if size < 0 else "+" + format_bytes(size)
+
+
+def process_rss() -> Optional[int]:
+    """Resident memory of the bot process in bytes, or None off Linux"""
+    try:
+        with open("/proc/self/status", "r") as read_file:
+            for line in read_file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def start_tracing():
+    """Starts tracemalloc if it isn't running. Only allocations made after this are seen by the snapshots."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+
+
+def take_snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+
+
+def top_allocation_sites(snapshot: tracemalloc.Snapshot, limit: int = TOP_ALLOCATION_SITES) -> str:
+    stats = snapshot.statistics("lineno")
+    total = sum(stat.size for stat in stats)
+    lines = [f"Traced: {format_bytes(total)} in {sum(stat.count for stat in stats):,} blocks"]
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        lines.append(f"{format_bytes(stat.size):>11} {stat.count:9,d}  {frame.filename}:{frame.lineno}")
+    return "\n".join(lines)
+
+
+def diff_snapshots(older: tracemalloc.Snapshot, newer: tracemalloc.Snapshot,
+                   limit: int = TOP_ALLOCATION_SITES) -> str:
+    stats = newer.compare_to(older, "lineno")
+    growth = sum(stat.size_diff for stat in stats)
+    lines = [f"Change: {format_bytes_diff(growth)}"]
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        lines.append(f"{format_bytes_diff(stat.size_diff):>12} {stat.count_diff:+9,d}  {frame.filename}:{frame.lineno}")
+    return "\n".join(lines)
+
+
+def db_section_sizes(db: dict) -> list[tuple[str, int, int]]:
+    """(section, number of entries, approximate bytes) for each top level key of bot.db, largest first"""
+    sections = [(str(key), len(value) if hasattr(value, "__len__") else 1, deep_getsizeof(value))
+                for key, value in db.items()]
+    return sorted(sections, key=lambda section: section[2], reverse=True)
+
+
+def discord_cache_counts(bot) -> list[tuple[str, int]]:
+    """Sizes of discord.py's own caches. Their objects use __slots__ and point at each other, so they're counted
+    rather than measured; the tracemalloc snapshots show what they cost."""
+    return [
+        ("guilds", len(bot.guilds)),
+        ("users", len(bot.users)),
+        ("members", sum(len(guild.members) for guild in bot.guilds)),
+        ("channels", sum(len(guild.channels) for guild in bot.guilds)),
+        ("threads", sum(len(guild.threads) for guild in bot.guilds)),
+        ("roles", sum(len(guild.roles) for guild in bot.guilds)),
+        ("emojis", len(bot.emojis)),
+        ("cached messages", len(bot.cached_messages)),
+        ("private channels", len(bot.private_channels)),
+        ("persistent views", len(bot.persistent_views)),
+    ]
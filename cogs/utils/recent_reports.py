@@ -0,0 +1,68 @@
+import time
+from collections import deque
+from typing import NamedTuple, Optional
+
+RECENT_REPORTS_PER_USER = 5  # only the last few reports of a user are shown in a new report thread
+RECENT_REPORTS_EXPIRY_DAYS = 365  # reports older than this aren't worth showing anymore
+
+
+class RecentReport(NamedTuple):
+    """One entry of bot.db['recent_reports'][guild_id][user_id]. Being a tuple, it's saved to the json as a
+    short list [thread_id, timestamp, summary] instead of a dict repeating the key names for every report."""
+    thread_id: int
+    timestamp: int
+    summary: Optional[str] = None
+
+
+def new_report_buffer(records=()) -> deque[RecentReport]:
+    """A ring buffer of a user's recent reports, adding a sixth report drops the oldest one"""
+    return deque(records, maxlen=RECENT_REPORTS_PER_USER)
+
+
+def load_recent_reports(data: Optional[dict]) -> dict[int, dict[int, deque[RecentReport]]]:
+    """Converts the bot.db['recent_reports'] section loaded from the json into ring buffers of RecentReport.
+
+    Accepts both the saved lists [thread_id, timestamp, summary] and the old dicts
+    {'thread_id': int, 'timestamp': int, 'summary': str}."""
+    recent_reports = {}
+    for guild_id, users in (data or {}).items():
+        recent_reports[guild_id] = {}
+        for user_id, records in users.items():
+            buffer = new_report_buffer()
+            for record in records:
+                if isinstance(record, dict):
+                    buffer.append(RecentReport(record['thread_id'], record['timestamp'], record.get('summary')))
+                else:
+                    buffer.append(RecentReport(*record))
+            recent_reports[guild_id][user_id] = buffer
+    expire_recent_reports(recent_reports)
+    return recent_reports
+
+
+def expire_recent_reports(recent_reports: dict[int, dict[int, deque[RecentReport]]],
+                          max_age_days: int = RECENT_REPORTS_EXPIRY_DAYS) -> list[tuple[int, int]]:
+    """Removes reports older than max_age_days, and users and guilds left without any reports.
+    Returns the (guild_id, user_id) pairs whose reports changed."""
+    cutoff = int(time.time()) - max_age_days * 86400
+    changed = []
+    for guild_id in list(recent_reports):
+        users = recent_reports[guild_id]
+        for user_id in list(users):
+            buffer = users[user_id]
+            # the buffer is in order of when the reports were made, so the old ones are all at the left
+            if buffer and buffer[0].timestamp < cutoff:
+                while buffer and buffer[0].timestamp < cutoff:
+                    buffer.popleft()
+                changed.append((guild_id, user_id))
+            if not buffer:
+                del users[user_id]
+        if not users:
+            del recent_reports[guild_id]
+    return changed
+
+
+def json_default(obj):
+    """Passed as default= to json.dump() so the ring buffers are saved as plain lists"""
+    if isinstance(obj, deque):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
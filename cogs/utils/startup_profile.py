@@ -0,0 +1,124 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Optional
+
+bot_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+REPORT_FILE = "startup_profile.txt"
+HISTORY_FILE = "startup_profiles.jsonl"  # one line per profiled startup, to compare against earlier ones
+
+# Imported in a fresh interpreter for the report, to show what each would cost at startup. sumy is imported
+# lazily inside the summarizer worker process, so it never shows up in the phases themselves.
+HEAVY_MODULES = ("discord", "aiohttp", "dotenv", "sumy.summarizers.lsa", "sumy.nlp.tokenizers")
+IMPORT_TIMEOUT = 60  # seconds
+
+
+def process_age() -> Optional[float]:
+    """Seconds since the process was started, from /proc (so the interpreter's own startup can be included), or
+    None off Linux"""
+    try:
+        with open("/proc/self/stat", "r") as read_file:
+            start_ticks = int(read_file.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", "r") as read_file:
+            uptime = float(read_file.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+
+
+def enabled() -> bool:
+    """True if started with --profile-startup or with STARTUP_PROFILE set in the environment or .env file"""
+    return "--profile-startup" in sys.argv or bool(os.getenv("STARTUP_PROFILE"))
+
+
+def cold_import_time(module: str) -> Optional[float]:
+    """Seconds to import a module in a new interpreter, or None if it isn't installed"""
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    try:
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                timeout=IMPORT_TIMEOUT, cwd=bot_dir)
+    except subprocess.TimeoutExpired:
+        return None
+    return float(result.stdout) if result.returncode == 0 else None
+
+
+class StartupProfile:
+    """Timestamps the phases of startup. Each checkpoint() closes the phase that started at the previous one, so
+    the calls are spread through Modbot.py and the cogs in the order startup runs them.
+
+    Recording is always on (it's a handful of perf_counter() calls), the report is only written if enabled()."""
+    def __init__(self):
+        self.last = time.perf_counter()
+        self.phases: list[tuple[str, float]] = []  # (name, seconds)
+        self.finished = False
+        if (age := process_age()) is not None:
+            self.phases.append(("interpreter startup", max(0.0, age)))
+
+    def checkpoint(self, name: str):
+        if self.finished:
+            return
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def total(self) -> float:
+        return sum(seconds for _, seconds in self.phases)
+
+    def previous_run(self) -> Optional[dict]:
+        try:
+            with open(f"{bot_dir}/{HISTORY_FILE}", "r") as read_file:
+                lines = read_file.read().splitlines()
+        except OSError:
+            return None
+        try:
+            return json.loads(lines[-1]) if lines else None
+        except json.JSONDecodeError:
+            # a run killed while writing leaves a partial line, profile without the comparison rather than fail
+            return None
+
+    def report(self, previous: Optional[dict], import_times: dict[str, Optional[float]]) -> str:
+        total = self.total()
+        previous_phases = dict(previous["phases"]) if previous else {}
+        lines = [f"Startup profile {datetime.now().isoformat(timespec='seconds')}, total {total:.2f}s"
+                 + (f" (previous run {previous['total']:.2f}s)" if previous else ""),
+                 "",
+                 f"{'phase':<42} {'ms':>9} {'%':>6} {'previous ms':>12}"]
+        for name, seconds in self.phases:
+            before = previous_phases.get(name)
+            lines.append(f"{name:<42} {seconds * 1000:9.1f} {seconds / total * 100 if total else 0:6.1f} "
+                         f"{f'{before * 1000:.1f}' if before is not None else '-':>12}")
+
+        lines += ["", "Import time of heavy modules in a fresh interpreter:"]
+        for module, seconds in import_times.items():
+            lines.append(f"{module:<42} {f'{seconds * 1000:9.1f}' if seconds is not None else '  not installed'}")
+        return "\n".join(lines)
+
+    def write(self):
+        """Writes the report and adds this run to the history. Blocking (it runs an interpreter per heavy module),
+        so call it in a thread."""
+        previous = self.previous_run()
+        import_times = {module: cold_import_time(module) for module in HEAVY_MODULES}
+        report = self.report(previous, import_times)
+        with open(f"{bot_dir}/{REPORT_FILE}", "w") as write_file:
+            write_file.write(report + "\n")
+        with open(f"{bot_dir}/{HISTORY_FILE}", "a") as write_file:
+            write_file.write(json.dumps({"date": datetime.now().isoformat(timespec="seconds"),
+                                         "total": self.total(),
+                                         "phases": self.phases}) + "\n")
+        print(report)
+
+    async def finish(self):
+        """Called at the end of the first on_ready"""
+        if self.finished:
+            return
+        self.finished = True
+        if enabled():
+            await asyncio.to_thread(self.write)
+
+
+profile = StartupProfile()
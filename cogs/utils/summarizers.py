@@ -0,0 +1,143 @@
+import asyncio
+import hashlib
+import os
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    # only for annotations: a spawned summarizer worker imports this module, and shouldn't pay for aiohttp
+    from cogs.utils.http_client import HTTPClient
+
+SUMMARY_CACHE_SIZE = 1024  # number of summaries to remember per engine
+
+
+def sumy_summarize(text: str, language: str = "english", sentences_count: int = 1) -> str:
+    """Summarizes text with sumy's LSA summarizer. This is CPU heavy (LSA does an SVD), so it's run in a
+    separate process by SumySummarizer rather than on the event loop."""
+    from sumy.parsers.plaintext import PlaintextParser
+    from sumy.nlp.tokenizers import Tokenizer
+    from sumy.summarizers import lsa
+
+    parser = PlaintextParser.from_string(text, Tokenizer(language))
+    # luhn, edmundson, lsa, lex_rank, sum_basic, kl, reduction
+    # summarizers = [luhn.LuhnSummarizer(),
+    #                lsa.LsaSummarizer(), lex_rank.LexRankSummarizer(),
+    #                sum_basic.SumBasicSummarizer(), kl.KLSummarizer(),
+    #                reduction.ReductionSummarizer()]
+    summarizer = lsa.LsaSummarizer()
+    summary = summarizer(parser.document, sentences_count)
+
+    return ' '.join(str(sentence) for sentence in summary)
+
+
+async def eden_summarize(http_client: 'HTTPClient', text, language="en", sentences_count=1) -> str:
+    url = "https://api.edenai.run/v2/text/summarize"
+    payload = {
+        "response_as_dict": True,
+        "attributes_as_list": False,
+        "show_original_response": False,
+        "output_sentences": sentences_count,
+        "providers": "cohere",
+        "text": text,
+        "language": language,
+    }
+    headers = {
+        "accept": "application/json",
+        "content-type": "application/json",
+        "authorization": "Bearer " + os.getenv("EDEN_KEY"),
+    }
+
+    # each call is billed, and summary_worker() already retries failed summaries
+    response = await http_client.post_json(url, json=payload, headers=headers, max_retries=0)
+
+    if 'cohere' in response:
+        response = response['cohere']
+        if response['status'] == 'success':
+            return response['result']
+
+    # if the response is not successful, raise an error
+    raise Exception(f"EdenAI API returned an error: {response}")
+
+
+class Summarizer(ABC):
+    """Base class for the summarizer engines"""
+    name = ""
+
+    @abstractmethod
+    async def summarize(self, text: str, sentences_count: int = 1) -> str:
+        ...
+
+    def close(self):
+        pass
+
+
+class EdenSummarizer(Summarizer):
+    """Summarizes through the EdenAI API (needs EDEN_KEY in the .env file)"""
+    name = "eden"
+
+    def __init__(self, http_client: 'HTTPClient'):
+        self.http_client = http_client
+
+    async def summarize(self, text: str, sentences_count: int = 1) -> str:
+        return await eden_summarize(self.http_client, text, language="en", sentences_count=sentences_count)
+
+
+class SumySummarizer(Summarizer):
+    """Summarizes locally with sumy, in a process pool so it doesn't block the event loop"""
+    name = "sumy"
+
+    def __init__(self, language: str = "english", max_workers: int = 1):
+        # imported here like sumy itself, concurrent.futures.process pulls in most of multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.language = language
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+
+    async def summarize(self, text: str, sentences_count: int = 1) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, sumy_summarize, text, self.language, sentences_count)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class CachedSummarizer(Summarizer):
+    """Wraps another engine and remembers its results by a hash of the text, so the same text is never
+    summarized twice"""
+    def __init__(self, engine: Summarizer, max_size: int = SUMMARY_CACHE_SIZE):
+        self.engine = engine
+        self.name = engine.name
+        self.max_size = max_size
+        self.cache: OrderedDict[str, str] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def summarize(self, text: str, sentences_count: int = 1) -> str:
+        key = hashlib.sha256(f"{sentences_count}:{text}".encode()).hexdigest()
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        self.misses += 1
+        summary = await self.engine.summarize(text, sentences_count)
+        self.cache[key] = summary
+        if len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+        return summary
+
+    def close(self):
+        self.engine.close()
+
+
+ENGINES = [EdenSummarizer.name, SumySummarizer.name]
+
+
+def make_summarizer(name: str, http_client: 'HTTPClient') -> Optional[CachedSummarizer]:
+    """Creates a cached summarizer for an engine name in ENGINES, or returns None for an unknown name"""
+    if name == EdenSummarizer.name:
+        return CachedSummarizer(EdenSummarizer(http_client))
+    elif name == SumySummarizer.name:
+        return CachedSummarizer(SumySummarizer())
+    return None
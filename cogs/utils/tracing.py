@@ -0,0 +1,150 @@
+import asyncio
+import functools
+import json
+import os
+import secrets
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+bot_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+# The category attribute says where the time of a span went, so slow report openings can be broken down:
+#   "user"  - waiting for the user to answer (think time)
+#   "rai"   - waiting for Rai to post its modlog in a new report thread
+#   "db"    - saving the database
+#   "pause" - deliberate sleeps, like letting the typing indicator show before a report room opens
+#   "api"   - Discord API calls (the default for spans that don't say otherwise)
+CATEGORIES = ("user", "rai", "db", "pause", "api")
+
+MAX_PENDING_SPANS = 10000  # finished spans kept in memory between flushes, the oldest are dropped past this
+
+
+class Span:
+    """One timed step of a trace, exported in a format close to an OpenTelemetry span"""
+    __slots__ = ("name", "trace_id", "span_id", "parent_span_id", "attributes", "start_ns", "end_ns", "status")
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: Optional[str], attributes: dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.status = "ok"
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_json(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+current_trace: ContextVar[Optional[Span]] = ContextVar("current_trace", default=None)  # root span of the trace
+
+pending_spans: list[dict] = []
+
+
+def trace_file() -> Optional[str]:
+    """The file from TRACE_FILE in the .env file (relative to the bot folder), or None if tracing is off"""
+    path = os.getenv("TRACE_FILE")
+    return os.path.join(bot_dir, path) if path else None
+
+
+@contextmanager
+def _run_span(name: str, trace_id: str, parent: Optional[Span], attributes: dict) -> Iterator[Span]:
+    span_ = Span(name, trace_id, parent.span_id if parent else None, attributes)
+    span_token = current_span.set(span_)
+    trace_token = current_trace.set(span_) if parent is None else None
+    try:
+        yield span_
+    except BaseException as e:
+        span_.status = "error"
+        span_.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        span_.end_ns = time.time_ns()
+        current_span.reset(span_token)
+        if trace_token:
+            current_trace.reset(trace_token)
+        pending_spans.append(span_.to_json())
+        if len(pending_spans) > MAX_PENDING_SPANS:
+            del pending_spans[:len(pending_spans) - MAX_PENDING_SPANS]
+
+
+@contextmanager
+def trace(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """A span that starts a new trace if there's no current one, or else is a child of the current span.
+    Yields None (and records nothing) if tracing is off."""
+    parent = current_span.get()
+    if parent is None and not trace_file():
+        yield None
+        return
+    with _run_span(name, parent.trace_id if parent else secrets.token_hex(16), parent, attributes) as span_:
+        yield span_
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """A child of the current span. Outside of a trace (like the dump_json() of the autosave loop), nothing is
+    recorded and it yields None."""
+    parent = current_span.get()
+    if parent is None:
+        yield None
+        return
+    with _run_span(name, parent.trace_id, parent, attributes) as span_:
+        yield span_
+
+
+def traced(name: Optional[str] = None, starts_trace: bool = False, **attributes):
+    """Decorator for coroutine functions, running each call in a span named after the function"""
+    def decorator(func):
+        context_manager = trace if starts_trace else span
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with context_manager(name or func.__name__, **attributes):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def set_trace_attributes(**attributes):
+    """Adds attributes (like the report ID once the thread exists) to the root span of the current trace"""
+    root = current_trace.get()
+    if root:
+        root.set(**attributes)
+
+
+def _write_spans_sync(path: str, spans: list[dict]):
+    with open(path, "a") as write_file:
+        for span_ in spans:
+            write_file.write(json.dumps(span_, default=str) + "\n")
+
+
+async def flush():
+    """Appends the finished spans to the trace file, one json object per line"""
+    path = trace_file()
+    if not pending_spans or not path:
+        pending_spans.clear()
+        return
+    spans = pending_spans[:]
+    pending_spans.clear()
+    try:
+        await asyncio.to_thread(_write_spans_sync, path, spans)
+    except OSError as e:
+        print(f"Failed to write {len(spans)} spans to {path}: {e!r}", file=sys.stderr)